@@ -1,28 +1,106 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from apscheduler.schedulers.background import BackgroundScheduler
 import os
+from app.replicas import RoutingSession
 
 
 
 # create database object globally
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 def create_app() :
     app = Flask(__name__)
     app.config['SECRET_KEY'] = "9950"
-    # app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:///company.db"
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get("DATABASE_URL_EXTERNAL")
+    # without DATABASE_URL_EXTERNAL, run on instance/company.db (WAL, tuned pragmas: see app/engine.py)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get("DATABASE_URL_EXTERNAL", "sqlite:///company.db")
+    app.config['SQLITE_TUNED'] = os.environ.get("SQLITE_TUNED", "1") == "1"
     app.config['SQLALCHEMY_TRACK_NOTIFICATIONS'] = False
+    # pool sizing / pre-ping / recycle / statement timeout, validated here (see app/engine.py)
+    from app.engine import engine_options
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+    # optional read replicas (comma separated URLs) for GET requests to these blueprints (see app/replicas.py)
+    from app.replicas import replica_binds
+    app.config['SQLALCHEMY_BINDS'] = replica_binds(os.environ.get("DATABASE_REPLICA_URLS"))
+    app.config['READ_REPLICA_BLUEPRINTS'] = {
+        name.strip() for name in os.environ.get("READ_REPLICA_BLUEPRINTS", "tasks,reports,api,exports").split(",") if name.strip()
+    }
+    # seconds a replica may replay behind, between health checks, and that a writer stays on the primary
+    app.config['READ_REPLICA_MAX_LAG'] = float(os.environ.get("READ_REPLICA_MAX_LAG", 10))
+    app.config['READ_REPLICA_CHECK_INTERVAL'] = float(os.environ.get("READ_REPLICA_CHECK_INTERVAL", 15))
+    app.config['READ_REPLICA_PIN_SECONDS'] = float(os.environ.get("READ_REPLICA_PIN_SECONDS", 10))
+    # seconds a worker may serve the cached dashboard before recomputing it
+    app.config['DASHBOARD_CACHE_TTL'] = int(os.environ.get("DASHBOARD_CACHE_TTL", 30))
+    # seconds before a worker reloads its client/worker name directory
+    app.config['PARTY_CACHE_TTL'] = int(os.environ.get("PARTY_CACHE_TTL", 300))
+    # per-request query counting / Server-Timing (off unless asked for)
+    app.config['SQL_INSTRUMENTATION'] = os.environ.get("SQL_INSTRUMENTATION", "0") == "1"
+    app.config['SQL_QUERY_WARN_THRESHOLD'] = int(os.environ.get("SQL_QUERY_WARN_THRESHOLD", 10))
+    # rollup / reconciliation jobs; safe to enable in every worker
+    app.config['SCHEDULER_ENABLED'] = os.environ.get("SCHEDULER_ENABLED", "0") == "1"
+    # run pending migrations when run.py is imported; gunicorn.conf.py turns this
+    # off so production boots skip schema work (use `flask --app app migrate`)
+    app.config['AUTO_MIGRATE'] = os.environ.get("AUTO_MIGRATE", "1") == "1"
+    # seconds a submitted form's key is remembered (resubmissions within it are ignored)
+    app.config['IDEMPOTENCY_KEY_TTL'] = int(os.environ.get("IDEMPOTENCY_KEY_TTL", 24 * 3600))
+    # live dashboard: file used to fan events out when not on PostgreSQL,
+    # keep-alive interval and how long one stream stays open before the browser reconnects
+    app.config['EVENT_LOG'] = os.environ.get("EVENT_LOG", os.path.join(app.instance_path, "events.jsonl"))
+    app.config['EVENT_HEARTBEAT'] = int(os.environ.get("EVENT_HEARTBEAT", 15))
+    app.config['EVENT_STREAM_SECONDS'] = int(os.environ.get("EVENT_STREAM_SECONDS", 300))
+    # open streams per worker (default: half the gthread threads), and how long
+    # a browser turned away waits before trying again
+    from app.engine import event_stream_limit
+    app.config['EVENT_MAX_STREAMS'] = event_stream_limit()
+    app.config['EVENT_BUSY_RETRY_MS'] = int(os.environ.get("EVENT_BUSY_RETRY_MS", 60000))
+    # fingerprinted, minified and precompressed CSS/JS (see app/assets.py) and gzipped HTML/JSON
+    app.config['ASSET_FINGERPRINTS'] = os.environ.get("ASSET_FINGERPRINTS", "1") == "1"
+    app.config['ASSET_DIR'] = os.environ.get("ASSET_DIR", os.path.join(app.instance_path, "assets"))
+    app.config['GZIP_RESPONSES'] = os.environ.get("GZIP_RESPONSES", "1") == "1"
+    app.config['GZIP_MIN_SIZE'] = int(os.environ.get("GZIP_MIN_SIZE", 500))
+    # background statements / reports: files, threads per process, queue poll, stuck-job timeout, retention
+    app.config['REPORT_DIR'] = os.environ.get("REPORT_DIR", os.path.join(app.instance_path, "reports"))
+    app.config['REPORT_WORKERS'] = int(os.environ.get("REPORT_WORKERS", 2))
+    app.config['REPORT_POLL_SECONDS'] = int(os.environ.get("REPORT_POLL_SECONDS", 15))
+    app.config['REPORT_JOB_TIMEOUT'] = int(os.environ.get("REPORT_JOB_TIMEOUT", 30 * 60))
+    app.config['REPORT_TTL'] = int(os.environ.get("REPORT_TTL", 7 * 24 * 3600))
+    os.makedirs(app.instance_path, exist_ok=True)
 
     #connecting the database
     db.init_app(app)
+    from app.engine import init_sqlite
+    init_sqlite(app)
 
     from app.routes.auth import auth_bp
     from app.routes.tasks import task_bp
+    from app.routes.exports import export_bp
+    from app.routes.imports import import_bp
+    from app.routes.api import api_bp
+    from app.routes.reports import report_bp
 
     # app.register_blueprint(auth_bp)
     app.register_blueprint(task_bp)
     app.register_blueprint(auth_bp)
+    app.register_blueprint(export_bp)
+    app.register_blueprint(import_bp)
+    app.register_blueprint(api_bp)
+    app.register_blueprint(report_bp)
+
+    from app.commands import register_commands
+    register_commands(app)
+
+    from app.instrumentation import init_instrumentation
+    init_instrumentation(app)
+
+    from app.engine import init_pool_metrics
+    init_pool_metrics(app)
+
+    from app.idempotency import init_idempotency
+    init_idempotency(app)
+
+    from app.replicas import init_replicas
+    init_replicas(app)
+
+    from app.assets import init_assets
+    init_assets(app)
 
     return app
\ No newline at end of file
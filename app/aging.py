@@ -0,0 +1,144 @@
+"""Receivables / payables aging.
+
+Payments are matched to orders (clients) or work done (workers) oldest
+first.  Whatever a party has paid in total covers its earliest entries, so
+an entry is open by however much of it lies past that total on the
+party's running sum.  One query computes the running sum with a window
+function over every party at once, ages the open amounts against
+``as_of`` and sums them into 0-30 / 31-60 / 61-90 / 90+ day buckets.
+Entries moved out by a period close are aged from their own dates, read
+from the archive tables.
+
+For today the paid totals come from ``party_balance``.  An earlier
+``as_of`` rebuilds them from the payments (live and archived) dated up to
+it, and leaves out later entries.
+"""
+from datetime import date
+from sqlalchemy import text
+from app import db
+
+# bucket column -> label
+AGING_BUCKETS = {
+    "days_0_30": "0–30 days",
+    "days_31_60": "31–60 days",
+    "days_61_90": "61–90 days",
+    "days_over_90": "90+ days",
+}
+
+# status -> (entries table, its primary key, payments table)
+AGING_SOURCES = {
+    "Client": ("client__order__details", "co_id", "client_payment_details"),
+    "Worker": ("worker_work__details", "ww_id", "worker__payment__details"),
+}
+
+# parties with a balance carried out of closed periods; their archived
+# entries are only read when some of it is still open
+CARRIED_SQL = """
+        SELECT ob.cw_id, SUM(ob.total_ordered) AS ordered, SUM(ob.total_paid) AS paid,
+               MAX(ob.period_end) AS period_end
+        FROM opening_balance ob
+        JOIN client_workers cw ON cw.cw_id = ob.cw_id
+        WHERE cw.status = :status
+        GROUP BY ob.cw_id
+"""
+
+# archived entries keep their own dates; a carried balance that was fully
+# paid stands in as one (fully covered) entry instead
+CURRENT_ENTRIES_SQL = """
+        SELECT e.cw_id, e.date, e.{pk} AS entry_id, COALESCE(e.total_amount, 0) AS amount
+        FROM {table} e
+        JOIN client_workers cw ON cw.cw_id = e.cw_id
+        WHERE cw.status = :status
+        UNION ALL
+        SELECT a.cw_id, a.date, a.{pk}, COALESCE(a.total_amount, 0)
+        FROM {table}_archive a
+        JOIN carried c ON c.cw_id = a.cw_id
+        WHERE c.ordered > c.paid
+        UNION ALL
+        SELECT cw_id, period_end, 0, ordered
+        FROM carried
+        WHERE ordered <= paid
+"""
+
+CURRENT_PAID_SQL = "SELECT cw_id, total_paid FROM party_balance"
+
+# the archive tables hold every row of the closed periods, so live + archive
+# is the whole ledger
+AS_OF_ENTRIES_SQL = """
+        SELECT e.cw_id, e.date, e.{pk} AS entry_id, COALESCE(e.total_amount, 0) AS amount
+        FROM (
+            SELECT cw_id, date, {pk}, total_amount FROM {table}
+            UNION ALL
+            SELECT cw_id, date, {pk}, total_amount FROM {table}_archive
+        ) e
+        JOIN client_workers cw ON cw.cw_id = e.cw_id
+        WHERE cw.status = :status AND e.date <= :as_of
+"""
+
+AS_OF_PAID_SQL = """
+        SELECT cw_id, SUM(amount) AS total_paid
+        FROM (
+            SELECT cw_id, COALESCE(amount, 0) AS amount FROM {payments} WHERE date <= :as_of
+            UNION ALL
+            SELECT cw_id, COALESCE(amount, 0) FROM {payments}_archive WHERE date <= :as_of
+        ) p
+        GROUP BY cw_id
+"""
+
+AGING_SQL = """
+    WITH carried AS ({carried}),
+    entries AS ({entries}),
+    paid AS ({paid}),
+    running AS (
+        SELECT cw_id, date, amount,
+               SUM(amount) OVER (PARTITION BY cw_id ORDER BY date, entry_id ROWS UNBOUNDED PRECEDING) AS through_here
+        FROM entries
+    ),
+    open_entries AS (
+        SELECT r.cw_id, {age} AS age,
+               CASE
+                   WHEN r.through_here <= COALESCE(b.total_paid, 0) THEN 0
+                   WHEN r.through_here - r.amount >= COALESCE(b.total_paid, 0) THEN r.amount
+                   ELSE r.through_here - COALESCE(b.total_paid, 0)
+               END AS open_amount
+        FROM running r
+        LEFT JOIN paid b ON b.cw_id = r.cw_id
+    )
+    SELECT cw.client_name,
+           SUM(CASE WHEN age <= 30 THEN open_amount ELSE 0 END) AS days_0_30,
+           SUM(CASE WHEN age > 30 AND age <= 60 THEN open_amount ELSE 0 END) AS days_31_60,
+           SUM(CASE WHEN age > 60 AND age <= 90 THEN open_amount ELSE 0 END) AS days_61_90,
+           SUM(CASE WHEN age > 90 THEN open_amount ELSE 0 END) AS days_over_90,
+           SUM(open_amount) AS total
+    FROM open_entries oe
+    JOIN client_workers cw ON cw.cw_id = oe.cw_id
+    GROUP BY cw.cw_id, cw.client_name
+    HAVING SUM(open_amount) > 0
+    ORDER BY total DESC, cw.client_name
+"""
+
+
+def age_expression(dialect_name, column="r.date"):
+    """Days from ``column`` to the ``:as_of`` parameter."""
+    if dialect_name == "postgresql":
+        return f"(CAST(:as_of AS DATE) - {column})"
+    return f"(julianday(:as_of) - julianday({column}))"
+
+
+def aging_report(status, as_of=None):
+    """Open amounts per party and age bucket, largest total first."""
+    today = date.today()
+    as_of = as_of or today
+    table, pk, payments = AGING_SOURCES[status]
+    params = {"status": status, "as_of": as_of.isoformat()}
+    if as_of == today:
+        entries, paid = CURRENT_ENTRIES_SQL, CURRENT_PAID_SQL
+    else:
+        entries, paid = AS_OF_ENTRIES_SQL, AS_OF_PAID_SQL
+    sql = AGING_SQL.format(
+        carried=CARRIED_SQL,
+        entries=entries.format(table=table, pk=pk),
+        paid=paid.format(payments=payments),
+        age=age_expression(db.engine.dialect.name),
+    )
+    return db.session.execute(text(sql), params).mappings().all()
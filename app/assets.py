@@ -0,0 +1,167 @@
+"""Fingerprinted static assets and response compression, without a build step.
+
+When the app starts, ``build_assets()`` concatenates each entry of
+``BUNDLES`` and minifies it and every other CSS/JS file under
+``app/static``.  Each result is written to ``ASSET_DIR`` under a
+content-hashed name (``css/site.3f9a1c0b7e21.css``), next to ``.gz`` and,
+if the optional ``brotli`` package is installed, ``.br`` copies.  Templates
+link them with ``asset_url("css/site.css")``.  ``/assets/...`` serves them
+with a one-year ``immutable`` Cache-Control, so browsers never revalidate
+them, and picks the precompressed copy the browser accepts.  A changed
+file gets a new name, so a deploy is picked up on the next page load.
+
+HTML and JSON responses are gzipped on the fly when the client accepts
+it.  Streams (SSE, CSV exports) and files are left alone.
+"""
+import gzip
+import hashlib
+import logging
+import os
+import re
+from flask import abort, request, send_from_directory, url_for
+
+logger = logging.getLogger(__name__)
+
+# bundle name -> source files under app/static, in order
+BUNDLES = {
+    "css/site.css": ["css/main.css", "css/dashboard.css", "css/forms.css", "css/tables.css", "css/cart_style.css"],
+}
+
+# precompressed copies, in the order we prefer them
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+COMPRESSIBLE_TYPES = ("text/html", "application/json")
+
+
+def minify_css(source):
+    source = re.sub(r"/\*.*?\*/", "", source, flags=re.S)
+    source = re.sub(r"\s+", " ", source)
+    source = re.sub(r"\s*([{};,])\s*", r"\1", source)
+    source = re.sub(r":\s+", ":", source)
+    return source.replace(";}", "}").strip()
+
+
+def minify_js(source):
+    """Drop indentation, blank lines and whole-line comments; nothing riskier."""
+    lines = (line.strip() for line in source.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//")) + "\n"
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+def _write(path, data):
+    """Write ``data`` to ``path`` atomically, skipping files that already exist."""
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build_assets(static_folder, out_dir):
+    """Build every bundle and asset into ``out_dir``; return {logical name: hashed name}."""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    bundled = {source for sources in BUNDLES.values() for source in sources}
+    singles = [
+        os.path.relpath(os.path.join(root, filename), static_folder).replace(os.sep, "/")
+        for root, _, filenames in os.walk(static_folder)
+        for filename in filenames
+        if os.path.splitext(filename)[1] in MINIFIERS
+    ]
+    assets = dict(BUNDLES)
+    assets.update({name: [name] for name in sorted(singles) if name not in bundled})
+
+    manifest = {}
+    for name, sources in assets.items():
+        stem, ext = os.path.splitext(name)
+        text = "\n".join(
+            open(os.path.join(static_folder, source), encoding="utf-8").read() for source in sources
+        )
+        data = MINIFIERS[ext](text).encode("utf-8")
+        hashed = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+        path = os.path.join(out_dir, hashed)
+        _write(path, data)
+        _write(path + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write(path + ".br", brotli.compress(data))
+        manifest[name] = hashed
+    return manifest
+
+
+# ---------------- RESPONSE COMPRESSION ----------------
+def compress_response(response, min_size):
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or response.mimetype not in COMPRESSIBLE_TYPES
+        or "Content-Encoding" in response.headers
+        or not request.accept_encodings["gzip"]
+    ):
+        return response
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    # the bytes differ per encoding, so a strong validator no longer holds
+    tag, weak = response.get_etag()
+    if tag and not weak:
+        response.set_etag(tag, weak=True)
+    return response
+
+
+def init_assets(app):
+    manifest = {}
+    if app.config["ASSET_FINGERPRINTS"]:
+        try:
+            manifest = build_assets(app.static_folder, app.config["ASSET_DIR"])
+        except OSError:
+            # plain /static URLs still work, just without long caching
+            logger.exception("could not build assets into %s", app.config["ASSET_DIR"])
+
+    def asset_url(name):
+        if name in manifest:
+            return url_for("assets", filename=manifest[name])
+        return url_for("static", filename=name)
+
+    app.jinja_env.globals["asset_url"] = asset_url
+
+    hashed_names = set(manifest.values())
+
+    def serve_asset(filename):
+        if filename not in hashed_names:
+            abort(404)
+        response = None
+        for encoding, suffix in ENCODINGS:
+            if request.accept_encodings[encoding] and os.path.exists(os.path.join(app.config["ASSET_DIR"], filename + suffix)):
+                response = send_from_directory(app.config["ASSET_DIR"], filename + suffix,
+                                               mimetype=_mimetype(filename))
+                response.headers["Content-Encoding"] = encoding
+                break
+        if response is None:
+            response = send_from_directory(app.config["ASSET_DIR"], filename)
+        response.vary.add("Accept-Encoding")
+        response.headers["Cache-Control"] = IMMUTABLE
+        return response
+
+    app.add_url_rule("/assets/<path:filename>", "assets", serve_asset)
+
+    if app.config["GZIP_RESPONSES"]:
+        min_size = app.config["GZIP_MIN_SIZE"]
+        app.after_request(lambda response: compress_response(response, min_size))
+
+
+def _mimetype(filename):
+    return "text/css" if filename.endswith(".css") else "text/javascript"
@@ -0,0 +1,166 @@
+"""Per-party balance summary.
+
+``party_balance`` keeps one row per client/worker with the running order
+and payment totals, so the list pages and the dashboard never have to
+aggregate the full ledger tables.  The add_* routes call ``record_order`` /
+``record_payment`` before committing, which keeps the summary in the same
+transaction as the ledger row.  ``rebuild_balances`` and ``verify_balances``
+recompute everything from the raw ledgers.  Both first lock
+``party_balance`` against writers (PostgreSQL; on SQLite the caller's
+``write_transaction()`` does it), so a payment committed halfway through
+neither looks like drift nor collides with the rebuild.
+"""
+from datetime import datetime
+from sqlalchemy import bindparam, text, case
+from app import db
+from app.changes import bump
+from app.models import party_balance
+
+
+# Orders/work and payments for both clients and workers, totalled per party,
+# plus the totals carried forward from closed periods (app.periods).
+BALANCE_SOURCE_SQL = """
+    SELECT
+    cw.cw_id,
+    COALESCE(o.total, 0) AS total_ordered,
+    COALESCE(p.total, 0) AS total_paid,
+    CASE
+        WHEN o.last_date IS NULL THEN p.last_date
+        WHEN p.last_date IS NULL OR o.last_date > p.last_date THEN o.last_date
+        ELSE p.last_date
+    END AS last_activity
+    FROM client_workers cw
+    LEFT JOIN (
+        SELECT cw_id, SUM(total_amount) AS total, MAX(date) AS last_date
+        FROM (
+            SELECT cw_id, total_amount, date FROM client__order__details
+            UNION ALL
+            SELECT cw_id, total_amount, date FROM worker_work__details
+            UNION ALL
+            SELECT cw_id, total_ordered, last_activity FROM opening_balance
+        ) orders
+        GROUP BY cw_id
+    ) o ON cw.cw_id = o.cw_id
+    LEFT JOIN (
+        SELECT cw_id, SUM(amount) AS total, MAX(date) AS last_date
+        FROM (
+            SELECT cw_id, amount, date FROM client_payment_details
+            UNION ALL
+            SELECT cw_id, amount, date FROM worker__payment__details
+            UNION ALL
+            SELECT cw_id, total_paid, last_activity FROM opening_balance
+        ) payments
+        GROUP BY cw_id
+    ) p ON cw.cw_id = p.cw_id
+"""
+
+# rows are updated in place, never deleted, so a concurrent _apply always finds
+# its row; SQLite needs the WHERE to tell the SELECT from the ON CONFLICT clause
+REBUILD_SQL = f"""
+    INSERT INTO party_balance (cw_id, total_ordered, total_paid, last_activity)
+    SELECT * FROM ({BALANCE_SOURCE_SQL}) source WHERE TRUE
+    ON CONFLICT (cw_id) DO UPDATE SET
+        total_ordered = excluded.total_ordered,
+        total_paid = excluded.total_paid,
+        last_activity = excluded.last_activity
+"""
+
+APPLY_UPSERT_SQL = text("""
+    INSERT INTO party_balance (cw_id, total_ordered, total_paid, last_activity)
+    VALUES (:cw_id, :ordered, :paid, :on_date)
+    ON CONFLICT (cw_id) DO UPDATE SET
+        total_ordered = party_balance.total_ordered + excluded.total_ordered,
+        total_paid = party_balance.total_paid + excluded.total_paid,
+        last_activity = CASE
+            WHEN party_balance.last_activity IS NULL OR party_balance.last_activity < excluded.last_activity
+            THEN excluded.last_activity
+            ELSE party_balance.last_activity
+        END
+""").bindparams(bindparam("on_date", type_=db.Date))
+
+
+def lock_balances():
+    """Hold off balance writers until the current transaction ends (PostgreSQL only)."""
+    if db.session.get_bind().dialect.name == "postgresql":
+        db.session.execute(text("LOCK TABLE party_balance IN SHARE ROW EXCLUSIVE MODE"))
+
+
+def open_balance(cw_id):
+    """Add an empty balance row for a newly created client/worker."""
+    db.session.add(party_balance(cw_id=cw_id, total_ordered=0, total_paid=0))
+    bump("client_workers", "party_balance")
+
+
+def record_order(cw_id, amount, on_date):
+    """Add an order (or worker work) amount to the party's balance."""
+    _apply(cw_id, amount or 0, 0, on_date)
+    bump("party_balance")
+
+
+def record_payment(cw_id, amount, on_date):
+    """Add a payment amount to the party's balance."""
+    _apply(cw_id, 0, amount or 0, on_date)
+    bump("party_balance")
+
+
+def record_totals(totals):
+    """Apply many parties' changes at once: ``{cw_id: (ordered, paid, last_date)}``."""
+    for cw_id, (ordered, paid, on_date) in totals.items():
+        _apply(cw_id, ordered, paid, on_date)
+    bump("party_balance")
+
+
+def _apply(cw_id, ordered, paid, on_date):
+    if isinstance(on_date, datetime):
+        on_date = on_date.date()
+    result = db.session.execute(
+        db.update(party_balance)
+        .where(party_balance.cw_id == cw_id)
+        .values(
+            total_ordered=party_balance.total_ordered + ordered,
+            total_paid=party_balance.total_paid + paid,
+            last_activity=case(
+                (party_balance.last_activity.is_(None), on_date),
+                (party_balance.last_activity < on_date, on_date),
+                else_=party_balance.last_activity,
+            ),
+        )
+    )
+    if result.rowcount == 0:
+        # Party created before the balance table existed, or another
+        # transaction is inserting its row right now
+        db.session.execute(APPLY_UPSERT_SQL, {"cw_id": cw_id, "ordered": ordered, "paid": paid, "on_date": on_date})
+
+
+def rebuild_balances():
+    """Recompute every balance row from the ledger tables. Caller commits."""
+    lock_balances()
+    db.session.execute(text(REBUILD_SQL))
+    bump("party_balance")
+
+
+def verify_balances():
+    """Return a list of parties whose stored balance differs from the ledgers."""
+    lock_balances()
+    expected = db.session.execute(text(BALANCE_SOURCE_SQL)).mappings().all()
+    stored = {
+        row.cw_id: row
+        for row in db.session.execute(db.select(party_balance)).scalars()
+    }
+
+    mismatches = []
+    for row in expected:
+        current = stored.get(row["cw_id"])
+        if (
+            current is None
+            or current.total_ordered != row["total_ordered"]
+            or current.total_paid != row["total_paid"]
+        ):
+            mismatches.append({
+                "cw_id": row["cw_id"],
+                "expected_ordered": row["total_ordered"],
+                "expected_paid": row["total_paid"],
+                "stored_ordered": current.total_ordered if current else None,
+                "stored_paid": current.total_paid if current else None,
+            })
+    return mismatches
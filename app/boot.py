@@ -0,0 +1,43 @@
+"""Process start-up for gunicorn's ``preload_app`` mode.
+
+The master imports the app once, warms the per-process caches and drops
+its database connections (primary and replicas) before forking, so
+every worker starts with the party directory and dashboard already
+loaded and without sockets it shares with its siblings.  Threads do not survive a fork, so the
+scheduler is started in each worker afterwards.  See gunicorn.conf.py.
+"""
+import logging
+import time
+from app import db
+
+logger = logging.getLogger(__name__)
+
+
+def warm_caches(app):
+    """Load the party directory and the dashboard payload into this process."""
+    from app.cache import dashboard_cache
+    from app.parties import party_directory, trigram_available
+    from app.routes.tasks import load_dashboard
+
+    started = time.perf_counter()
+    with app.app_context():
+        party_directory.names("Client")
+        dashboard_cache.get_or_set("dashboard", load_dashboard)
+        trigram_available()
+    logger.info("caches warmed in %.0f ms", (time.perf_counter() - started) * 1000)
+
+
+def before_fork(app):
+    try:
+        warm_caches(app)
+    except Exception:
+        # a cold cache is only slower; do not keep the server from starting
+        logger.exception("cache warm-up failed, workers will start cold")
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def after_fork(app):
+    from app.jobs import init_scheduler
+    init_scheduler(app)
@@ -0,0 +1,51 @@
+"""Small in-process caches shared by the views.
+
+Each gunicorn worker keeps its own copy, so the TTL bounds how stale a
+worker can be after another worker handles a write.  Writes handled by the
+same worker clear the cache straight away.
+"""
+import threading
+import time
+from flask import current_app
+
+
+class TTLCache:
+    def __init__(self, config_key, default_ttl):
+        self.config_key = config_key
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._items = {}
+
+    @property
+    def ttl(self):
+        return current_app.config.get(self.config_key, self.default_ttl)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+
+    def get_or_set(self, key, factory):
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+# dashboard payload, cleared by every add_* route
+dashboard_cache = TTLCache("DASHBOARD_CACHE_TTL", 30)
@@ -0,0 +1,59 @@
+"""Per-table change counters for cheap ETags.
+
+Every write path already funnels through ``app.balances`` (party and
+ledger rows) or ``app.rollups`` (raw materials); those call ``bump()`` in
+the same transaction, so a counter changes exactly when its data does.
+Building an ETag then costs one primary-key read of ``change_counter``
+instead of the aggregates behind the response.
+"""
+import hashlib
+from flask import Response, make_response, request
+from app import db
+from app.models import change_counter
+
+# client_workers: parties added; party_balance: any ledger row for any party;
+# raw_material: purchases
+TRACKED = ("client_workers", "party_balance", "raw_material")
+
+
+def bump(*names, conn=None):
+    """Advance the counters for ``names``. Caller commits."""
+    (conn or db.session).execute(
+        db.update(change_counter)
+        .where(change_counter.name.in_(names))
+        .values(version=change_counter.version + 1)
+    )
+
+
+def versions(*names):
+    rows = db.session.execute(
+        db.select(change_counter.name, change_counter.version).where(change_counter.name.in_(names))
+    ).all()
+    found = dict(rows)
+    return tuple(found.get(name, 0) for name in names)
+
+
+def etag_for(resource, names, *key):
+    """Opaque tag for ``resource`` (plus request ``key`` parts) at the current versions."""
+    raw = repr((resource, key, versions(*names)))
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def conditional(resource, names, build, *key):
+    """Answer 304 if the client's ETag is current, else call ``build()`` for the response.
+
+    ``build`` is only run on a miss, so an unchanged resource costs one
+    counter read.  Error responses from ``build`` are passed through untagged.
+    """
+    tag = etag_for(resource, names, *key)
+    # weak match: the tag is marked weak when the response is gzipped
+    if request.if_none_match.contains_weak(tag):
+        response = Response(status=304)
+    else:
+        response = make_response(build())
+        if response.status_code != 200:
+            return response
+    response.set_etag(tag)
+    # the data is per login, and must be revalidated on every use
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
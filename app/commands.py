@@ -0,0 +1,138 @@
+import click
+from flask.cli import AppGroup, with_appcontext
+from app import db
+from app.balances import rebuild_balances, verify_balances
+from app.importer import IMPORT_KINDS, import_csv
+from app.rollups import rebuild_raw_material_rollup, rebuild_ledger_rollup
+from app.jobs import JOBS, run_job
+from app.models import job_run, period_close
+from app.periods import close_period
+from app.migrations import available_migrations, applied_versions, upgrade_schema
+
+
+balances_cli = AppGroup("balances", help="Maintain the per-party balance table.")
+
+
+@balances_cli.command("rebuild")
+def rebuild_command():
+    """Recompute party balances from the ledger tables."""
+    rebuild_balances()
+    db.session.commit()
+    click.echo("Party balances rebuilt.")
+
+
+@balances_cli.command("verify")
+def verify_command():
+    """Compare stored party balances with the ledger tables."""
+    mismatches = verify_balances()
+    for m in mismatches:
+        click.echo(
+            f"cw_id={m['cw_id']}: ordered {m['stored_ordered']} != {m['expected_ordered']}, "
+            f"paid {m['stored_paid']} != {m['expected_paid']}"
+        )
+    if mismatches:
+        raise SystemExit(f"{len(mismatches)} balance(s) out of date, run 'flask balances rebuild'.")
+    click.echo("All party balances match the ledgers.")
+
+
+rollups_cli = AppGroup("rollups", help="Maintain the precomputed report tables.")
+
+
+@rollups_cli.command("rebuild")
+def rebuild_rollups_command():
+    """Recompute the raw-material and ledger rollups."""
+    rebuild_raw_material_rollup()
+    rebuild_ledger_rollup()
+    db.session.commit()
+    click.echo("Rollups rebuilt.")
+
+
+jobs_cli = AppGroup("jobs", help="Run or inspect the scheduled jobs.")
+
+
+@jobs_cli.command("run")
+@click.argument("name", type=click.Choice(sorted(JOBS)))
+def run_job_command(name):
+    """Run one scheduled job now (skipped if another process holds it)."""
+    run = run_job(name)
+    if run is None:
+        raise SystemExit(f"{name} is already running elsewhere.")
+    click.echo(f"{name}: {run.status} in {run.duration_ms:.0f} ms ({run.detail})")
+
+
+@jobs_cli.command("history")
+@click.option("--limit", default=20, show_default=True)
+def job_history_command(limit):
+    """Show the most recent job runs."""
+    runs = db.session.execute(
+        db.select(job_run).order_by(job_run.started_at.desc()).limit(limit)
+    ).scalars()
+    for run in runs:
+        took = f"{run.duration_ms:.0f} ms" if run.duration_ms is not None else "-"
+        click.echo(f"{run.started_at:%Y-%m-%d %H:%M:%S}  {run.job:<20} {run.status:<8} {took:>10}  {run.detail or ''}")
+
+
+periods_cli = AppGroup("periods", help="Close financial periods into the archive tables.")
+
+
+@periods_cli.command("close")
+@click.argument("period_end", type=click.DateTime(formats=["%Y-%m-%d"]))
+def close_period_command(period_end):
+    """Archive all entries dated on or before PERIOD_END (YYYY-MM-DD)."""
+    try:
+        moved = close_period(period_end.date())
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+    db.session.commit()
+    for table, count in moved.items():
+        click.echo(f"{table}: {count} rows archived")
+    click.echo(f"Closed through {period_end:%Y-%m-%d}.")
+
+
+@periods_cli.command("list")
+def list_periods_command():
+    """Show the closed periods."""
+    closes = db.session.execute(db.select(period_close).order_by(period_close.period_end)).scalars()
+    for close in closes:
+        click.echo(f"{close.period_end:%Y-%m-%d}  closed {close.closed_at:%Y-%m-%d %H:%M}  {close.rows_archived} rows")
+
+
+@click.command("migrate")
+@click.option("--status", is_flag=True, help="List migrations without applying them.")
+@with_appcontext
+def migrate_command(status):
+    """Apply pending schema migrations."""
+    if status:
+        with db.engine.connect() as conn:
+            done = applied_versions(conn)
+            conn.commit()
+        for version, _ in available_migrations():
+            click.echo(f"[{'x' if version in done else ' '}] {version}")
+        return
+
+    applied = upgrade_schema(db.engine)
+    for version in applied:
+        click.echo(f"Applied {version}")
+    if not applied:
+        click.echo("Schema is up to date.")
+
+
+@click.command("import-csv")
+@click.argument("kind", type=click.Choice(sorted(IMPORT_KINDS)))
+@click.argument("csv_file", type=click.File("r", encoding="utf-8-sig"))
+@with_appcontext
+def import_csv_command(kind, csv_file):
+    """Bulk import ledger rows or raw materials from a CSV file."""
+    report = import_csv(kind, csv_file)
+    for line, message in report.errors:
+        click.echo(f"line {line}: {message}", err=True)
+    click.echo(f"Imported {report.inserted} rows, rejected {len(report.errors)}.")
+
+
+def register_commands(app):
+    app.cli.add_command(balances_cli)
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(periods_cli)
+    app.cli.add_command(migrate_command)
+    app.cli.add_command(import_csv_command)
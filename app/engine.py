@@ -0,0 +1,341 @@
+"""Engine and connection-pool configuration.
+
+``engine_options()`` turns the ``DB_*`` / gunicorn environment variables
+into ``SQLALCHEMY_ENGINE_OPTIONS``, validating them when the app starts.
+Pool sizes default from the gunicorn worker class (one connection per
+thread, plus a little overflow for the scheduler), and when
+``DB_MAX_CONNECTIONS`` is set the defaults are shrunk to fit it.  Explicit
+settings that would not fit are rejected instead.
+
+The pool is an ``InstrumentedQueuePool``, which times every checkout;
+``/metrics/pool`` reports wait times, timeouts and saturation.
+
+On SQLite every connection is switched to WAL with the ``SQLITE_*``
+pragmas below, and transactions started inside ``write_transaction()``
+begin with ``BEGIN IMMEDIATE``.  That takes SQLite's single write lock up
+front, so concurrent writers across worker processes queue on
+``busy_timeout`` instead of failing with "database is locked" when they
+upgrade from reading to writing.  The write forms (``@idempotent``), the
+scheduled jobs and the report threads' status updates run inside it;
+everything else, read-only POSTs such as login included, begins a plain
+deferred transaction.  Readers never wait in WAL mode.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:
+    # Windows: BEGIN IMMEDIATE and busy_timeout alone serialize writers
+    fcntl = None
+from flask import jsonify
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+WORKER_CLASSES = ("sync", "gthread", "gevent")
+
+# connections left free for psql, migrations and the scheduler of a deploy in progress
+RESERVED_CONNECTIONS = 5
+
+
+def _int_setting(environ, name, default, minimum=0):
+    raw = environ.get(name)
+    if raw in (None, ""):
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be a whole number, got '{raw}'")
+    if value < minimum:
+        raise ValueError(f"{name} must be at least {minimum}, got {value}")
+    return value
+
+
+def _bool_setting(environ, name, default):
+    raw = environ.get(name)
+    if raw in (None, ""):
+        return default
+    if raw.lower() in ("1", "true", "yes", "on"):
+        return True
+    if raw.lower() in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"{name} must be 1 or 0, got '{raw}'")
+
+
+def server_settings(environ=os.environ):
+    """Gunicorn worker class, worker count and threads, shared with gunicorn.conf.py."""
+    worker_class = environ.get("GUNICORN_WORKER_CLASS", "gthread")
+    if worker_class not in WORKER_CLASSES:
+        raise ValueError(f"GUNICORN_WORKER_CLASS must be one of {', '.join(WORKER_CLASSES)}, got '{worker_class}'")
+    workers = _int_setting(environ, "WEB_CONCURRENCY", 2, minimum=1)
+    threads = _int_setting(environ, "GUNICORN_THREADS", 4 if worker_class == "gthread" else 1, minimum=1)
+    return worker_class, workers, threads
+
+
+def event_stream_limit(environ=os.environ):
+    """Dashboard event streams one worker may hold open (EVENT_MAX_STREAMS).
+
+    A gthread stream occupies a thread for up to EVENT_STREAM_SECONDS, so by
+    default at most half of them may stream and the rest stay free for form
+    posts; a sync worker has no thread to spare, and gevent streams are cheap.
+    """
+    worker_class, _, threads = server_settings(environ)
+    default = 1000 if worker_class == "gevent" else threads // 2
+    return _int_setting(environ, "EVENT_MAX_STREAMS", default, minimum=0)
+
+
+def _pool_defaults(worker_class, threads):
+    """(pool_size, max_overflow) for one worker process."""
+    if worker_class == "gthread":
+        return threads, 2
+    if worker_class == "gevent":
+        # greenlets queue on the pool rather than each holding a connection
+        return 10, 5
+    return 1, 2
+
+
+def engine_options(database_uri, environ=os.environ):
+    """Build and validate SQLALCHEMY_ENGINE_OPTIONS for ``database_uri``."""
+    if not database_uri:
+        return {}
+    url = make_url(database_uri)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # Flask-SQLAlchemy forces a StaticPool for in-memory databases
+        return {}
+
+    worker_class, workers, threads = server_settings(environ)
+    default_size, default_overflow = _pool_defaults(worker_class, threads)
+    explicit = "DB_POOL_SIZE" in environ or "DB_MAX_OVERFLOW" in environ
+
+    # each worker also holds one LISTEN connection for live dashboard events
+    listener = 1 if url.get_backend_name() == "postgresql" else 0
+
+    max_connections = _int_setting(environ, "DB_MAX_CONNECTIONS", 0)
+    if max_connections:
+        budget = (max_connections - RESERVED_CONNECTIONS) // workers - listener
+        if budget < 1:
+            raise ValueError(
+                f"DB_MAX_CONNECTIONS={max_connections} leaves no connections for "
+                f"{workers} workers ({RESERVED_CONNECTIONS} are reserved)"
+            )
+        if not explicit and default_size + default_overflow > budget:
+            default_size = min(default_size, budget)
+            default_overflow = budget - default_size
+
+    pool_size = _int_setting(environ, "DB_POOL_SIZE", default_size, minimum=1)
+    max_overflow = _int_setting(environ, "DB_MAX_OVERFLOW", default_overflow)
+    if max_connections and workers * (pool_size + max_overflow + listener) > max_connections - RESERVED_CONNECTIONS:
+        raise ValueError(
+            f"{workers} workers x (DB_POOL_SIZE={pool_size} + DB_MAX_OVERFLOW={max_overflow} + {listener} listener) "
+            f"exceeds DB_MAX_CONNECTIONS={max_connections} minus {RESERVED_CONNECTIONS} reserved"
+        )
+    if worker_class == "gthread" and pool_size + max_overflow < threads:
+        # allowed (threads wait up to DB_POOL_TIMEOUT), but worth knowing about
+        logger.warning(
+            "pool of %d + %d overflow is smaller than GUNICORN_THREADS=%d; threads will queue for connections",
+            pool_size, max_overflow, threads,
+        )
+
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": _int_setting(environ, "DB_POOL_TIMEOUT", 10, minimum=1),
+        # recycle before the server or a proxy drops idle connections
+        "pool_recycle": _int_setting(environ, "DB_POOL_RECYCLE", 1800, minimum=-1),
+        "pool_pre_ping": _bool_setting(environ, "DB_POOL_PRE_PING", True),
+    }
+    if url.get_backend_name() == "postgresql":
+        statement_timeout = _int_setting(environ, "DB_STATEMENT_TIMEOUT_MS", 30000)
+        if statement_timeout:
+            options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout}"}
+    return options
+
+
+# ---------------- SQLITE ----------------
+SQLITE_SYNCHRONOUS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+
+def sqlite_settings(environ=os.environ):
+    """Validated pragma values for SQLite connections."""
+    synchronous = environ.get("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+    if synchronous not in SQLITE_SYNCHRONOUS:
+        raise ValueError(f"SQLITE_SYNCHRONOUS must be one of {', '.join(SQLITE_SYNCHRONOUS)}, got '{synchronous}'")
+    return {
+        # NORMAL only syncs at checkpoints in WAL mode; a power cut can lose the last commits, never corrupt
+        "synchronous": synchronous,
+        "cache_size_kb": _int_setting(environ, "SQLITE_CACHE_SIZE_KB", 64 * 1024),
+        "mmap_size": _int_setting(environ, "SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+        "busy_timeout_ms": _int_setting(environ, "SQLITE_BUSY_TIMEOUT_MS", 10000),
+    }
+
+
+def _tune_sqlite(engine, settings):
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        # let SQLAlchemy, not the driver, emit BEGIN (see begin_transaction)
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={settings['synchronous']}")
+        cursor.execute(f"PRAGMA cache_size=-{settings['cache_size_kb']}")
+        cursor.execute(f"PRAGMA mmap_size={settings['mmap_size']}")
+        cursor.execute(f"PRAGMA busy_timeout={settings['busy_timeout_ms']}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    database = engine.url.database
+    lock_path = f"{database}.write-lock" if fcntl and database and database != ":memory:" else None
+
+    @event.listens_for(engine, "begin")
+    def begin_transaction(conn):
+        if getattr(_write_intent, "depth", 0):
+            if lock_path:
+                _take_write_lock(conn.connection.info, lock_path)
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        else:
+            conn.exec_driver_sql("BEGIN")
+
+    if lock_path:
+        @event.listens_for(engine.pool, "checkin")
+        def release_on_checkin(dbapi_connection, connection_record):
+            _release_write_lock(connection_record.info)
+
+        @event.listens_for(engine.pool, "invalidate")
+        def release_on_invalidate(dbapi_connection, connection_record, exception):
+            _release_write_lock(connection_record.info)
+
+
+# how many write_transaction() blocks this thread is inside
+_write_intent = threading.local()
+
+# the write lock this thread already holds, so a second connection in the same
+# request falls back to SQLite's busy_timeout instead of waiting on itself
+_write_lock_owner = threading.local()
+
+
+@contextmanager
+def write_transaction():
+    """Begin the SQLite transactions started in this block with the write lock.
+
+    Use it around work that reads and then writes in one transaction; it
+    does nothing on other databases.
+    """
+    _write_intent.depth = getattr(_write_intent, "depth", 0) + 1
+    try:
+        yield
+    finally:
+        _write_intent.depth -= 1
+
+
+def _take_write_lock(info, lock_path):
+    """Block until this connection holds the cross-process write lock file.
+
+    SQLite's own busy handler sleeps up to 100 ms between retries, leaving
+    the database idle after the writer it waited for has finished; the
+    kernel hands a flock to the next waiter as soon as it is released.  A
+    worker that dies (or is killed by gunicorn's timeout) releases it too.
+    """
+    if getattr(_write_lock_owner, "held", False):
+        return
+    if "write_lock_fd" not in info:
+        info["write_lock_fd"] = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    fcntl.flock(info["write_lock_fd"], fcntl.LOCK_EX)
+    info["write_locked"] = True
+    _write_lock_owner.held = True
+
+
+def _release_write_lock(info):
+    if info.pop("write_locked", False):
+        fcntl.flock(info["write_lock_fd"], fcntl.LOCK_UN)
+        _write_lock_owner.held = False
+
+
+def init_sqlite(app):
+    """Apply the SQLite pragmas and write serialization to every SQLite engine."""
+    if not app.config.get("SQLITE_TUNED"):
+        return
+    from app import db
+
+    settings = sqlite_settings()
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == "sqlite":
+                _tune_sqlite(engine, settings)
+
+
+# ---------------- POOL METRICS ----------------
+class PoolMetrics:
+    """Checkout timings for this process's pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.peak_checked_out = 0
+
+    def record(self, waited, checked_out, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def snapshot(self, pool):
+        with self._lock:
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            checked_out = pool.checkedout()
+            return {
+                "pool_size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "checked_out": checked_out,
+                "idle": pool.checkedin(),
+                "saturation": round(checked_out / capacity, 3) if capacity else None,
+                "peak_checked_out": self.peak_checked_out,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            pool_metrics.record(time.perf_counter() - started, self.checkedout(), timed_out=True)
+            raise
+        pool_metrics.record(time.perf_counter() - started, self.checkedout())
+        return connection
+
+
+def init_pool_metrics(app):
+    from app import db
+    from app.routes.tasks import login_required
+
+    @login_required
+    def pool_status():
+        pool = db.engine.pool
+        if not isinstance(pool, InstrumentedQueuePool):
+            return jsonify({"pool": type(pool).__name__, "instrumented": False})
+        return jsonify(pool_metrics.snapshot(pool))
+
+    app.add_url_rule("/metrics/pool", "pool_metrics", pool_status)
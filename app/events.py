@@ -0,0 +1,207 @@
+"""Live dashboard events, streamed to browsers as Server-Sent Events.
+
+Write routes call ``publish()`` before committing.  The event waits on the
+session and only leaves the process if that transaction commits:
+
+* on PostgreSQL it is sent with ``pg_notify`` inside the transaction, so
+  the server delivers it on commit, to every gunicorn worker LISTENing;
+* elsewhere it is appended to ``EVENT_LOG`` (instance/events.jsonl) after
+  the commit, and every worker tails that file.
+
+Each worker runs one listener thread, started by the first open stream,
+which hands events to that worker's streams through ``hub``.  A worker
+holds at most EVENT_MAX_STREAMS streams; further browsers are told to
+retry later, so open dashboards cannot take every gthread thread.
+"""
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import time
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from app import db
+from app.models import party_balance
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "dashboard_events"
+
+# events buffered per open stream before it is told to resync instead
+STREAM_QUEUE_SIZE = 100
+
+# how often the file listener looks for new lines
+FILE_POLL_INTERVAL = 0.5
+
+# the event log is truncated once it grows past this
+EVENT_LOG_MAX_BYTES = 1024 * 1024
+
+
+def publish(payload):
+    """Queue ``payload`` (a JSON-able dict) to go out when the session commits."""
+    db.session.info.setdefault("pending_events", []).append(payload)
+
+
+def publish_ledger(status, side, name, cw_id, amount):
+    """Publish an order/work or payment with the party's new due amount."""
+    due = db.session.execute(
+        db.select(party_balance.due_amount).where(party_balance.cw_id == cw_id)
+    ).scalar()
+    publish({"type": "ledger", "status": status, "side": side, "name": name,
+             "amount": amount, "due_amount": due})
+
+
+def _is_postgres(session):
+    bind = session.get_bind()
+    return bind.dialect.name == "postgresql"
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_in_transaction(session):
+    pending = session.info.get("pending_events")
+    if pending and _is_postgres(session):
+        for payload in pending:
+            session.execute(text("SELECT pg_notify(:channel, :payload)"),
+                            {"channel": CHANNEL, "payload": json.dumps(payload, default=str)})
+        session.info["pending_events"] = []
+
+
+@event.listens_for(Session, "after_commit")
+def _append_after_commit(session):
+    pending = session.info.pop("pending_events", None)
+    if pending:
+        _append_to_log(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_on_rollback(session):
+    session.info.pop("pending_events", None)
+
+
+def _event_log_path():
+    from flask import current_app
+    return current_app.config["EVENT_LOG"]
+
+
+def _append_to_log(events):
+    path = _event_log_path()
+    lines = "".join(json.dumps(e, default=str) + "\n" for e in events)
+    try:
+        if os.path.exists(path) and os.path.getsize(path) > EVENT_LOG_MAX_BYTES:
+            # tailing readers notice the shrink and start again from the top
+            open(path, "w").close()
+        with open(path, "a", encoding="utf-8") as log:
+            log.write(lines)
+    except OSError:
+        logger.exception("could not write dashboard events to %s", path)
+
+
+# ---------------- FAN-OUT ----------------
+class EventHub:
+    """Hands events to the streams open in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._streams = set()
+        self._listener = None
+
+    def subscribe(self, limit=None):
+        """A new stream, or None if ``limit`` streams are already open."""
+        stream = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        with self._lock:
+            if limit is not None and len(self._streams) >= limit:
+                return None
+            self._streams.add(stream)
+        return stream
+
+    def unsubscribe(self, stream):
+        with self._lock:
+            self._streams.discard(stream)
+
+    def broadcast(self, payload):
+        with self._lock:
+            streams = list(self._streams)
+        for stream in streams:
+            try:
+                stream.put_nowait(payload)
+            except queue.Full:
+                # a stalled browser: drop what it missed and make it reload once
+                with stream.mutex:
+                    stream.queue.clear()
+                stream.put_nowait({"type": "resync"})
+
+    def ensure_listener(self, app):
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            with app.app_context():
+                postgres = db.engine.dialect.name == "postgresql"
+            target = _listen_postgres if postgres else _tail_event_log
+            self._listener = threading.Thread(target=target, args=(app, self), daemon=True,
+                                              name="dashboard-events")
+            self._listener.start()
+
+
+hub = EventHub()
+
+
+def _listen_postgres(app, hub):
+    with app.app_context():
+        engine = db.engine
+    while True:
+        conn = None
+        try:
+            # a dedicated connection outside the pool, held for LISTEN only
+            cargs, cparams = engine.dialect.create_connect_args(engine.url)
+            conn = engine.dialect.connect(*cargs, **cparams)
+            conn.autocommit = True
+            conn.cursor().execute(f"LISTEN {CHANNEL}")
+            # anything sent while we were not listening is lost
+            hub.broadcast({"type": "resync"})
+            while True:
+                if select.select([conn], [], [], 30) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    hub.broadcast(json.loads(notify.payload))
+        except Exception:
+            logger.exception("dashboard event listener lost its connection, retrying")
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            time.sleep(5)
+
+
+def _tail_event_log(app, hub):
+    path = app.config["EVENT_LOG"]
+    offset = os.path.getsize(path) if os.path.exists(path) else 0
+    while True:
+        time.sleep(FILE_POLL_INTERVAL)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            continue
+        if size < offset:
+            offset = 0
+            hub.broadcast({"type": "resync"})
+        if size == offset:
+            continue
+        with open(path, "rb") as log:
+            log.seek(offset)
+            chunk = log.read()
+        # leave a half-written last line for the next pass
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            continue
+        offset += end + 1
+        for line in chunk[:end].decode("utf-8").split("\n"):
+            if line:
+                try:
+                    hub.broadcast(json.loads(line))
+                except ValueError:
+                    logger.warning("skipping bad dashboard event line: %r", line[:200])
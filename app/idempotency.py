@@ -0,0 +1,137 @@
+"""Idempotency keys for the write forms.
+
+Every write form carries a one-off ``idempotency_key`` (``{{ idempotency_field() }}``).
+The ``@idempotent`` route decorator inserts that key into
+``idempotency_key`` before the view runs, in the same transaction as the
+ledger rows, so the key is stored exactly when the write commits.  A
+resubmitted form (double click, browser retry, back + submit) finds its
+key taken and is redirected back with a notice instead of inserting again;
+a concurrent duplicate blocks on the key's primary key until the first
+request finishes.  Keys committed by this process are also kept in a
+small in-memory set, so most replays never reach the database.  Views
+that commit more than once (the bulk import, chunk by chunk) pass
+``commit_claim=True``: the key is committed on its own before the view
+runs, so a later chunk's rollback cannot release it.  The
+``evict_idempotency_keys`` job deletes keys older than IDEMPOTENCY_KEY_TTL.
+"""
+import functools
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import current_app, flash, redirect, request, url_for
+from markupsafe import Markup
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import db
+from app.engine import write_transaction
+from app.models import idempotency_key
+
+FORM_FIELD = "idempotency_key"
+KEY_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+# committed keys remembered per process
+RECENT_KEYS = 10_000
+
+
+class RecentKeys:
+    """Bounded, expiring set of keys this process has committed."""
+
+    def __init__(self, size):
+        self.size = size
+        self._lock = threading.Lock()
+        self._keys = OrderedDict()
+
+    def add(self, key, ttl):
+        with self._lock:
+            self._keys[key] = time.monotonic() + ttl
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.size:
+                self._keys.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            expires_at = self._keys.get(key)
+            if expires_at is None:
+                return False
+            if expires_at < time.monotonic():
+                del self._keys[key]
+                return False
+            return True
+
+
+recent_keys = RecentKeys(RECENT_KEYS)
+
+
+def idempotency_field():
+    return Markup(f'<input type="hidden" name="{FORM_FIELD}" value="{uuid.uuid4().hex}">')
+
+
+def _claim(key, commit=False):
+    """Insert ``key`` in the current transaction; False if it is already taken.
+
+    Runs before the view has written anything, so on a clash the whole
+    transaction can simply be rolled back.  With ``commit`` the claim is
+    committed straight away; if that fails the error propagates and the
+    view never runs.
+    """
+    try:
+        db.session.add(idempotency_key(key=key, endpoint=request.endpoint, created_at=datetime.utcnow()))
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        return False
+    db.session.info["idempotency_key"] = key
+    if commit:
+        db.session.commit()
+    return True
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_committed_key(session):
+    key = session.info.pop("idempotency_key", None)
+    if key:
+        recent_keys.add(key, current_app.config["IDEMPOTENCY_KEY_TTL"])
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_key(session):
+    session.info.pop("idempotency_key", None)
+
+
+def idempotent(redirect_endpoint, commit_claim=False):
+    """Run the view once per form key; replays redirect to ``redirect_endpoint``.
+
+    ``commit_claim`` commits the key before the view runs, for views that
+    commit more than once.
+    """
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        def wrapper(*args, **kwargs):
+            if request.method != "POST":
+                return view_func(*args, **kwargs)
+            # the form writes: on SQLite, take the write lock when its transaction begins
+            with write_transaction():
+                key = request.form.get(FORM_FIELD, "")
+                if not KEY_PATTERN.fullmatch(key):
+                    return view_func(*args, **kwargs)
+                if key in recent_keys or not _claim(key, commit_claim):
+                    flash("ℹ️ This form was already submitted; the repeat was ignored.", "info")
+                    return redirect(url_for(redirect_endpoint))
+                return view_func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def evict_keys(older_than):
+    """Delete keys created before ``older_than``; return how many. Caller commits."""
+    return db.session.execute(
+        db.delete(idempotency_key).where(idempotency_key.created_at < older_than)
+    ).rowcount
+
+
+def init_idempotency(app):
+    app.jinja_env.globals["idempotency_field"] = idempotency_field
@@ -0,0 +1,203 @@
+"""Bulk import of ledger rows and raw materials from CSV.
+
+Rows are parsed and validated up front, party names are resolved with a
+single query, and valid rows are inserted ``chunk_size`` at a time with
+one executemany per chunk.  Each chunk (rows plus the matching
+party_balance / raw_material_monthly updates) is its own transaction, so
+a bad chunk does not undo the ones already imported.
+"""
+import csv
+from datetime import datetime
+from app import db
+from app.balances import record_totals
+from app.cache import dashboard_cache
+from app.events import publish
+from app.periods import closed_through
+from app.rollups import month_start, record_raw_materials
+from app.models import (
+    raw_material,
+    client_payment_details,
+    Client_Order_Details,
+    client_workers,
+    Worker_work_Details,
+    Worker_Payment_Details
+)
+
+IMPORT_CHUNK_SIZE = 1000
+
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y")
+
+# kind -> (model, party status or None, ledger side, required columns, optional columns)
+IMPORT_KINDS = {
+    "client_orders": (Client_Order_Details, "Client", "ordered",
+                      ("party", "date", "item", "quantity", "price"), ("description",)),
+    "client_payments": (client_payment_details, "Client", "paid",
+                        ("party", "date", "amount"), ("mode", "description")),
+    "worker_work": (Worker_work_Details, "Worker", "ordered",
+                    ("party", "date", "item", "quantity", "price"), ("description",)),
+    "worker_payments": (Worker_Payment_Details, "Worker", "paid",
+                        ("party", "date", "amount"), ("mode", "description")),
+    "raw_materials": (raw_material, None, None,
+                      ("date", "item", "quantity", "price"), ()),
+}
+
+
+class ImportReport:
+    def __init__(self, kind):
+        self.kind = kind
+        self.inserted = 0
+        self.errors = []   # (line number, message)
+
+    def error(self, line, message):
+        self.errors.append((line, message))
+
+
+def _parse_date(value):
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"bad date '{value}'")
+
+
+def _parse_int(value, field):
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"{field} '{value}' is not a number")
+    if not number.is_integer():
+        raise ValueError(f"{field} '{value}' must be a whole number")
+    return int(number)
+
+
+def _parse_float(value, field):
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{field} '{value}' is not a number")
+
+
+def _validate(kind, record):
+    """Turn one CSV record into column values, raising ValueError on bad data."""
+    model, status, side, required, optional = IMPORT_KINDS[kind]
+    missing = [col for col in required if not record.get(col)]
+    if missing:
+        raise ValueError("missing " + ", ".join(missing))
+
+    values = {"date": _parse_date(record["date"])}
+    if "item" in required:
+        values["item"] = record["item"]
+    if model is raw_material:
+        values["quantity"] = _parse_int(record["quantity"], "quantity")
+        values["price"] = _parse_float(record["price"], "price")
+    elif side == "ordered":
+        values["quantity"] = _parse_int(record["quantity"], "quantity")
+        values["price"] = _parse_int(record["price"], "price")
+    else:
+        values["amount"] = _parse_int(record["amount"], "amount")
+    for col in optional:
+        values[col] = record.get(col) or None
+    return values
+
+
+def resolve_parties(names, status):
+    """Map party names to cw_id for one status with a single query."""
+    if not names:
+        return {}
+    rows = db.session.execute(
+        db.select(client_workers.client_name, client_workers.cw_id)
+        .where(client_workers.status == status, client_workers.client_name.in_(names))
+    ).all()
+    return {name: cw_id for name, cw_id in rows}
+
+
+def import_csv(kind, stream, chunk_size=IMPORT_CHUNK_SIZE):
+    """Import rows of ``kind`` from a text stream; return an ImportReport."""
+    model, status, side, required, optional = IMPORT_KINDS[kind]
+    report = ImportReport(kind)
+
+    reader = csv.DictReader(stream)
+    header = [h.strip().lower() for h in (reader.fieldnames or [])]
+    missing = [col for col in required if col not in header]
+    if missing:
+        report.error(1, "header is missing " + ", ".join(missing))
+        return report
+    reader.fieldnames = header
+
+    # parse and validate the whole file before the first query: in a write
+    # request that query takes SQLite's write lock (app.engine.write_transaction)
+    parsed = []
+    # line 1 is the header
+    for line, rec in enumerate(reader, start=2):
+        record = {k: (v or "").strip() for k, v in rec.items() if k}
+        try:
+            parsed.append((line, record.get("party"), _validate(kind, record)))
+        except ValueError as e:
+            report.error(line, str(e))
+
+    parties = {}
+    if status:
+        parties = resolve_parties({party for _, party, _ in parsed if party}, status)
+
+    closed = closed_through()
+    valid = []
+    for line, party, values in parsed:
+        if closed is not None and values["date"] <= closed:
+            report.error(line, f"date is in a closed period (closed through {closed:%d/%m/%Y})")
+            continue
+        if status:
+            cw_id = parties.get(party)
+            if cw_id is None:
+                report.error(line, f"unknown {status.lower()} '{party}'")
+                continue
+            values["cw_id"] = cw_id
+        valid.append((line, values))
+    report.errors.sort()
+
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        try:
+            _insert_chunk(model, side, [values for _, values in chunk])
+            db.session.commit()
+            report.inserted += len(chunk)
+        except Exception as e:
+            db.session.rollback()
+            report.error(chunk[0][0], f"lines {chunk[0][0]}-{chunk[-1][0]} not imported: {e}")
+
+    if report.inserted:
+        dashboard_cache.clear()
+        # too many rows for per-row deltas; open dashboards reload instead
+        publish({"type": "resync"})
+        db.session.commit()
+    return report
+
+
+def _insert_chunk(model, side, rows):
+    # totals come from what the database stored: the computed amount columns
+    # round (or not) per dialect, and the rollups must match the ledger exactly
+    if model is raw_material:
+        inserted = db.session.execute(
+            db.insert(model).returning(model.date, model.item, model.quantity, model.amount), rows
+        ).all()
+        months = {}
+        for day, item, quantity, amount in inserted:
+            key = (month_start(day), item)
+            month_quantity, month_amount, entries = months.get(key, (0, 0, 0))
+            months[key] = (month_quantity + quantity, month_amount + (amount or 0), entries + 1)
+        record_raw_materials(months)
+        return
+
+    amount_column = model.total_amount if side == "ordered" else model.amount
+    inserted = db.session.execute(
+        db.insert(model).returning(model.cw_id, model.date, amount_column), rows
+    ).all()
+    totals = {}
+    for cw_id, day, amount in inserted:
+        ordered, paid, last = totals.get(cw_id, (0, 0, day))
+        if side == "ordered":
+            ordered += amount or 0
+        else:
+            paid += amount or 0
+        totals[cw_id] = (ordered, paid, max(last, day))
+    record_totals(totals)
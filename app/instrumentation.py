@@ -0,0 +1,170 @@
+"""Opt-in per-request SQL and render timing.
+
+Enabled with ``SQL_INSTRUMENTATION=1``.  Every request then gets a
+``Server-Timing`` header (db / render / total), per-endpoint aggregates are
+served as JSON from ``/metrics/requests``, and a warning is logged when a
+request runs more than ``SQL_QUERY_WARN_THRESHOLD`` statements, naming the
+statement repeated most (the usual N+1 shape).
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from flask import g, has_request_context, jsonify, request
+from flask.signals import before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# slowest statements kept per endpoint
+SLOWEST_KEPT = 5
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.render_started = None
+        self.statements = Counter()
+        self.slowest = []   # (seconds, statement)
+
+    def add_query(self, statement, elapsed):
+        self.queries += 1
+        self.db_time += elapsed
+        self.statements[statement] += 1
+        self.slowest.append((elapsed, statement))
+        if len(self.slowest) > SLOWEST_KEPT:
+            self.slowest.sort(reverse=True)
+            self.slowest.pop()
+
+
+class EndpointMetrics:
+    """Running totals per endpoint for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, stats, total):
+        with self._lock:
+            m = self._endpoints.setdefault(endpoint, {
+                "requests": 0, "total_ms": 0.0, "db_ms": 0.0, "render_ms": 0.0,
+                "queries": 0, "max_queries": 0, "max_ms": 0.0, "slowest": [],
+            })
+            m["requests"] += 1
+            m["total_ms"] += total * 1000
+            m["db_ms"] += stats.db_time * 1000
+            m["render_ms"] += stats.render_time * 1000
+            m["queries"] += stats.queries
+            m["max_queries"] = max(m["max_queries"], stats.queries)
+            m["max_ms"] = max(m["max_ms"], total * 1000)
+            m["slowest"] = sorted(
+                m["slowest"] + [(round(s * 1000, 2), stmt[:300]) for s, stmt in stats.slowest],
+                reverse=True,
+            )[:SLOWEST_KEPT]
+
+    def snapshot(self):
+        with self._lock:
+            out = {}
+            for endpoint, m in self._endpoints.items():
+                n = m["requests"]
+                out[endpoint] = {
+                    "requests": n,
+                    "avg_ms": round(m["total_ms"] / n, 2),
+                    "max_ms": round(m["max_ms"], 2),
+                    "avg_db_ms": round(m["db_ms"] / n, 2),
+                    "avg_render_ms": round(m["render_ms"] / n, 2),
+                    "avg_queries": round(m["queries"] / n, 2),
+                    "max_queries": m["max_queries"],
+                    "slowest_statements": [{"ms": ms, "sql": sql} for ms, sql in m["slowest"]],
+                }
+            return out
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+endpoint_metrics = EndpointMetrics()
+
+
+def _current_stats():
+    if has_request_context():
+        return g.get("_sql_stats")
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    stats = _current_stats()
+    if stats is not None:
+        stats.add_query(statement, time.perf_counter() - started)
+
+
+def _before_render(sender, template, context, **extra):
+    stats = _current_stats()
+    if stats is not None:
+        stats.render_started = time.perf_counter()
+
+
+def _after_render(sender, template, context, **extra):
+    stats = _current_stats()
+    if stats is not None and stats.render_started is not None:
+        stats.render_time += time.perf_counter() - stats.render_started
+        stats.render_started = None
+
+
+def init_instrumentation(app):
+    if not app.config.get("SQL_INSTRUMENTATION"):
+        return
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    @app.before_request
+    def start_request_stats():
+        g._sql_stats = RequestStats()
+
+    @app.after_request
+    def finish_request_stats(response):
+        stats = g.pop("_sql_stats", None)
+        if stats is None:
+            return response
+
+        total = time.perf_counter() - stats.started
+        endpoint = request.endpoint or "<unmatched>"
+        endpoint_metrics.record(endpoint, stats, total)
+
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+            f"render;dur={stats.render_time * 1000:.1f}, "
+            f"total;dur={total * 1000:.1f}",
+        )
+
+        threshold = app.config.get("SQL_QUERY_WARN_THRESHOLD", 10)
+        if stats.queries > threshold:
+            statement, repeats = stats.statements.most_common(1)[0]
+            logger.warning(
+                "%s ran %d SQL statements (threshold %d); most repeated (%dx): %s",
+                endpoint, stats.queries, threshold, repeats, " ".join(statement.split())[:200],
+            )
+        return response
+
+    from app.routes.tasks import login_required
+
+    @login_required
+    def request_metrics():
+        return jsonify(endpoint_metrics.snapshot())
+
+    app.add_url_rule("/metrics/requests", "request_metrics", request_metrics)
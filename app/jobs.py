@@ -0,0 +1,212 @@
+"""Scheduled background jobs on APScheduler.
+
+Every gunicorn worker may start a scheduler (``SCHEDULER_ENABLED=1``), so
+each job first takes a lease row in ``job_lock``; only the process holding
+an unexpired lease runs it.  Taking the lease also records the scheduled
+fire time in ``job_lock.last_slot``, so the other processes skip that tick
+even when theirs arrives after the run has finished.  Each executed run
+is recorded in ``job_run`` with its duration and outcome.
+"""
+import logging
+import os
+import socket
+from datetime import date, datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.balances import rebuild_balances, verify_balances
+from app.cache import dashboard_cache
+from app.engine import write_transaction
+from app.events import publish
+from app.idempotency import evict_keys
+from app.models import job_lock, job_run
+from app.report_jobs import evict_reports, poll_report_jobs
+from app.rollups import rebuild_raw_material_rollup, refresh_ledger_rollup
+
+logger = logging.getLogger(__name__)
+
+# how long a lease lasts if its holder dies mid-run
+LEASE = timedelta(minutes=30)
+
+# how far back the nightly refresh reaches, for back-dated entries
+NIGHTLY_DAYS = 40
+
+
+def holder_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# ---------------- JOBS ----------------
+def hourly_rollups():
+    """Refresh yesterday's and today's ledger rollups (and their months)."""
+    today = date.today()
+    refresh_ledger_rollup(today - timedelta(days=1), today)
+    db.session.commit()
+    return "refreshed yesterday and today"
+
+
+def nightly_rollups():
+    """Refresh the last NIGHTLY_DAYS of ledger rollups and the raw-material rollup."""
+    today = date.today()
+    refresh_ledger_rollup(today - timedelta(days=NIGHTLY_DAYS), today)
+    rebuild_raw_material_rollup()
+    publish({"type": "resync"})
+    db.session.commit()
+    dashboard_cache.clear()
+    return f"refreshed {NIGHTLY_DAYS} days"
+
+
+def reconcile_balances():
+    """Check party_balance against the ledgers and rebuild it if they differ.
+
+    Verify and rebuild share one transaction, with party_balance locked by
+    verify_balances (and by run_job's write_transaction on SQLite).
+    """
+    mismatches = verify_balances()
+    if not mismatches:
+        return "balances match"
+    logger.warning("party_balance drifted for %d parties, rebuilding", len(mismatches))
+    rebuild_balances()
+    publish({"type": "resync"})
+    db.session.commit()
+    dashboard_cache.clear()
+    return f"rebuilt, {len(mismatches)} parties were off"
+
+
+def evict_idempotency_keys():
+    """Delete form keys older than IDEMPOTENCY_KEY_TTL."""
+    ttl = current_app.config["IDEMPOTENCY_KEY_TTL"]
+    evicted = evict_keys(datetime.utcnow() - timedelta(seconds=ttl))
+    db.session.commit()
+    return f"evicted {evicted} keys"
+
+
+def evict_report_files():
+    """Delete background reports (rows and files) older than REPORT_TTL."""
+    evicted = evict_reports(datetime.utcnow() - timedelta(seconds=current_app.config["REPORT_TTL"]))
+    db.session.commit()
+    return f"evicted {evicted} reports"
+
+
+# name -> (function, APScheduler trigger arguments)
+JOBS = {
+    "hourly_rollups": (hourly_rollups, {"trigger": "cron", "minute": 5}),
+    "nightly_rollups": (nightly_rollups, {"trigger": "cron", "hour": 1, "minute": 15}),
+    "reconcile_balances": (reconcile_balances, {"trigger": "cron", "hour": "*/6", "minute": 35}),
+    "evict_idempotency_keys": (evict_idempotency_keys, {"trigger": "cron", "minute": 50}),
+    "evict_report_files": (evict_report_files, {"trigger": "cron", "hour": 2, "minute": 40}),
+}
+
+
+# ---------------- LEASE ----------------
+def acquire_lease(name, holder, slot=None):
+    """Take or renew the lease on ``name``; return True if we hold it.
+
+    With a ``slot`` (the scheduled fire time, naive UTC) the lease is only
+    granted if no process has taken that slot, or a later one, already.
+    """
+    now = datetime.utcnow()
+    query = db.update(job_lock).where(
+        job_lock.name == name, db.or_(job_lock.expires_at < now, job_lock.holder == holder)
+    )
+    values = {"holder": holder, "expires_at": now + LEASE}
+    if slot is not None:
+        query = query.where(db.or_(job_lock.last_slot.is_(None), job_lock.last_slot < slot))
+        values["last_slot"] = slot
+    taken = db.session.execute(query.values(**values)).rowcount
+    if not taken:
+        try:
+            db.session.add(job_lock(name=name, holder=holder, expires_at=now + LEASE, last_slot=slot))
+            db.session.flush()
+            taken = 1
+        except IntegrityError:
+            db.session.rollback()
+            return False
+    db.session.commit()
+    return bool(taken)
+
+
+def release_lease(name, holder):
+    db.session.execute(
+        db.update(job_lock)
+        .where(job_lock.name == name, job_lock.holder == holder)
+        .values(expires_at=datetime.utcnow())
+    )
+    db.session.commit()
+
+
+def run_job(name, slot=None):
+    """Run one job if this process wins its lease (for ``slot``); return the job_run row or None."""
+    # every job reads and then writes; on SQLite take the write lock up front
+    with write_transaction():
+        return _run_job(name, slot)
+
+
+def _run_job(name, slot):
+    func, _ = JOBS[name]
+    holder = holder_id()
+    if not acquire_lease(name, holder, slot):
+        logger.info("job %s skipped, another process holds the lease or already ran this slot", name)
+        return None
+
+    run = job_run(job=name, holder=holder, started_at=datetime.utcnow(), status="running")
+    db.session.add(run)
+    db.session.commit()
+    run_id = run.run_id
+
+    try:
+        detail, status = func(), "success"
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("job %s failed", name)
+        detail, status = f"{type(e).__name__}: {e}", "failed"
+
+    run = db.session.get(job_run, run_id)
+    run.finished_at = datetime.utcnow()
+    run.duration_ms = (run.finished_at - run.started_at).total_seconds() * 1000
+    run.status = status
+    run.detail = (detail or "")[:500]
+    db.session.commit()
+    release_lease(name, holder)
+    return run
+
+
+# ---------------- SCHEDULER ----------------
+scheduler = None
+
+
+def current_slot(trigger):
+    """The latest fire time of ``trigger`` at or before now, as naive UTC."""
+    now = datetime.now(trigger.timezone)
+    slot = None
+    fire = trigger.get_next_fire_time(None, now - timedelta(days=1))
+    while fire is not None and fire <= now:
+        slot = fire
+        fire = trigger.get_next_fire_time(fire, fire + timedelta(microseconds=1))
+    return slot and slot.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def init_scheduler(app):
+    """Start the background scheduler for this process if enabled."""
+    global scheduler
+    if not app.config.get("SCHEDULER_ENABLED") or scheduler is not None:
+        return None
+
+    def in_app_context(name):
+        def job():
+            slot = current_slot(scheduler.get_job(name).trigger)
+            with app.app_context():
+                run_job(name, slot)
+        return job
+
+    # imported here so processes that never schedule (CLI, master) skip apscheduler
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    scheduler = BackgroundScheduler(daemon=True)
+    for name, (_, trigger) in JOBS.items():
+        scheduler.add_job(in_app_context(name), id=name, coalesce=True, max_instances=1, **trigger)
+    # every process polls: claiming a report job is atomic, so no lease is needed
+    scheduler.add_job(poll_report_jobs, "interval", args=[app], id="report_jobs", coalesce=True, max_instances=1,
+                      seconds=app.config["REPORT_POLL_SECONDS"])
+    scheduler.start()
+    return scheduler
@@ -0,0 +1,60 @@
+"""Versioned schema migrations.
+
+Each ``vNNNN_<name>.py`` module in this package defines ``upgrade(conn)``.
+``upgrade_schema`` applies the ones not yet listed in ``schema_migrations``
+in version order, inside one transaction.  Every migration is written to be
+safe to re-run (``IF NOT EXISTS`` / ``checkfirst``), so a half-migrated
+database can simply be upgraded again.
+"""
+import importlib
+import pkgutil
+from datetime import datetime
+from sqlalchemy import text
+
+
+# arbitrary key for pg_advisory_xact_lock so concurrent boots migrate once
+MIGRATION_LOCK_ID = 7241001
+
+
+def available_migrations():
+    """Return ``[(version, module)]`` sorted by version."""
+    found = []
+    for info in pkgutil.iter_modules(__path__):
+        if info.name.startswith("v") and info.name[1:5].isdigit():
+            module = importlib.import_module(f"{__name__}.{info.name}")
+            found.append((info.name, module))
+    return sorted(found)
+
+
+def applied_versions(conn):
+    _ensure_version_table(conn)
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def upgrade_schema(engine):
+    """Apply pending migrations; return the list of versions applied."""
+    applied = []
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+            # index builds and backfills may outlast DB_STATEMENT_TIMEOUT_MS
+            conn.execute(text("SET LOCAL statement_timeout = 0"))
+        done = applied_versions(conn)
+        for version, module in available_migrations():
+            if version in done:
+                continue
+            module.upgrade(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, applied_at) VALUES (:v, :at)"),
+                {"v": version, "at": datetime.utcnow()},
+            )
+            applied.append(version)
+    return applied
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version VARCHAR(100) PRIMARY KEY,"
+        " applied_at TIMESTAMP NOT NULL)"
+    ))
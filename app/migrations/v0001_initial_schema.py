@@ -0,0 +1,63 @@
+"""Original tables plus party_balance (previously made by db.create_all)."""
+from sqlalchemy import text
+from app import db
+from app.models import (
+    client_workers,
+    Client_Order_Details,
+    client_payment_details,
+    raw_material,
+    Worker_work_Details,
+    Worker_Payment_Details,
+    party_balance,
+)
+
+# ledger totals per party as they were when party_balance was introduced
+BACKFILL_SQL = """
+    SELECT
+    cw.cw_id,
+    COALESCE(o.total, 0) AS total_ordered,
+    COALESCE(p.total, 0) AS total_paid,
+    CASE
+        WHEN o.last_date IS NULL THEN p.last_date
+        WHEN p.last_date IS NULL OR o.last_date > p.last_date THEN o.last_date
+        ELSE p.last_date
+    END AS last_activity
+    FROM client_workers cw
+    LEFT JOIN (
+        SELECT cw_id, SUM(total_amount) AS total, MAX(date) AS last_date
+        FROM (
+            SELECT cw_id, total_amount, date FROM client__order__details
+            UNION ALL
+            SELECT cw_id, total_amount, date FROM worker_work__details
+        ) orders
+        GROUP BY cw_id
+    ) o ON cw.cw_id = o.cw_id
+    LEFT JOIN (
+        SELECT cw_id, SUM(amount) AS total, MAX(date) AS last_date
+        FROM (
+            SELECT cw_id, amount, date FROM client_payment_details
+            UNION ALL
+            SELECT cw_id, amount, date FROM worker__payment__details
+        ) payments
+        GROUP BY cw_id
+    ) p ON cw.cw_id = p.cw_id
+"""
+
+
+def upgrade(conn):
+    db.metadata.create_all(conn, checkfirst=True, tables=[
+        client_workers.__table__,
+        Client_Order_Details.__table__,
+        client_payment_details.__table__,
+        raw_material.__table__,
+        Worker_work_Details.__table__,
+        Worker_Payment_Details.__table__,
+        party_balance.__table__,
+    ])
+
+    # databases that predate party_balance start with it empty
+    if conn.execute(text("SELECT 1 FROM party_balance LIMIT 1")).first() is None:
+        conn.execute(text(
+            "INSERT INTO party_balance (cw_id, total_ordered, total_paid, last_activity) "
+            + BACKFILL_SQL
+        ))
@@ -0,0 +1,21 @@
+"""Indexes for the statement, listing and name-lookup queries."""
+from sqlalchemy import text
+
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_client_order_cw_date ON client__order__details (cw_id, date DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_client_payment_cw_date ON client_payment_details (cw_id, date DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_worker_work_cw_date ON worker_work__details (cw_id, date DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_worker_payment_cw_date ON worker__payment__details (cw_id, date DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_client_workers_status_name ON client_workers (status, client_name)",
+    "CREATE INDEX IF NOT EXISTS ix_client_workers_name ON client_workers (client_name)",
+    "CREATE INDEX IF NOT EXISTS ix_raw_material_date ON raw_material (date)",
+]
+
+
+def upgrade(conn):
+    for statement in INDEXES:
+        conn.execute(text(statement))
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("ANALYZE client__order__details, client_payment_details, "
+                          "worker_work__details, worker__payment__details, client_workers, raw_material"))
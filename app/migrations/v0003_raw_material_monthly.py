@@ -0,0 +1,10 @@
+"""Monthly raw-material rollup table, backfilled from raw_material."""
+from sqlalchemy import text
+from app.models import raw_material_monthly
+from app.rollups import rebuild_raw_material_rollup
+
+
+def upgrade(conn):
+    raw_material_monthly.__table__.create(conn, checkfirst=True)
+    if conn.execute(text("SELECT 1 FROM raw_material_monthly LIMIT 1")).first() is None:
+        rebuild_raw_material_rollup(conn)
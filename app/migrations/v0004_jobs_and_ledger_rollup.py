@@ -0,0 +1,11 @@
+"""Tables for the scheduled jobs (ledger_rollup, job_lock, job_run)."""
+from sqlalchemy import text
+from app.models import ledger_rollup, job_lock, job_run
+from app.rollups import rebuild_ledger_rollup
+
+
+def upgrade(conn):
+    for model in (ledger_rollup, job_lock, job_run):
+        model.__table__.create(conn, checkfirst=True)
+    if conn.execute(text("SELECT 1 FROM ledger_rollup LIMIT 1")).first() is None:
+        rebuild_ledger_rollup(conn)
@@ -0,0 +1,21 @@
+"""Trigram index on party names for typeahead and listing search (PostgreSQL only)."""
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    if conn.dialect.name != "postgresql":
+        # SQLite uses the in-memory prefix index in app.parties instead
+        return
+    # CREATE EXTENSION needs a privileged role; without pg_trgm the search
+    # endpoint falls back to the in-memory index, so do not fail the upgrade
+    savepoint = conn.begin_nested()
+    try:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        savepoint.commit()
+    except Exception:
+        savepoint.rollback()
+        return
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_client_workers_name_trgm "
+        "ON client_workers USING gin (client_name gin_trgm_ops)"
+    ))
@@ -0,0 +1,12 @@
+"""change_counter table for ETags, seeded with one row per tracked table."""
+from sqlalchemy import text
+from app.changes import TRACKED
+from app.models import change_counter
+
+
+def upgrade(conn):
+    change_counter.__table__.create(conn, checkfirst=True)
+    existing = {row[0] for row in conn.execute(text("SELECT name FROM change_counter"))}
+    for name in TRACKED:
+        if name not in existing:
+            conn.execute(text("INSERT INTO change_counter (name, version) VALUES (:name, 1)"), {"name": name})
@@ -0,0 +1,6 @@
+"""idempotency_key table for deduplicating form submissions."""
+from app.models import idempotency_key
+
+
+def upgrade(conn):
+    idempotency_key.__table__.create(conn, checkfirst=True)
@@ -0,0 +1,9 @@
+"""period_close, opening_balance and the ledger archive tables."""
+from app.models import ledger_archives, opening_balance, period_close
+
+
+def upgrade(conn):
+    period_close.__table__.create(conn, checkfirst=True)
+    opening_balance.__table__.create(conn, checkfirst=True)
+    for archive in ledger_archives.values():
+        archive.create(conn, checkfirst=True)
@@ -0,0 +1,6 @@
+"""report_job table for statements and reports built in the background."""
+from app.models import report_job
+
+
+def upgrade(conn):
+    report_job.__table__.create(conn, checkfirst=True)
@@ -0,0 +1,9 @@
+"""job_lock.last_slot, so each scheduled fire time runs once across processes."""
+from sqlalchemy import inspect, text
+
+
+def upgrade(conn):
+    # v0004 creates job_lock from the current model, which already has the column
+    if "last_slot" in {c["name"] for c in inspect(conn).get_columns("job_lock")}:
+        return
+    conn.execute(text("ALTER TABLE job_lock ADD COLUMN last_slot TIMESTAMP"))
@@ -9,6 +9,11 @@ class client_workers(db.Model) :
     client_order = db.relationship('Client_Order_Details', backref='student', lazy=True)
     client_payment = db.relationship('client_payment_details', backref='student', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_client_workers_status_name', 'status', 'client_name'),
+        db.Index('ix_client_workers_name', 'client_name'),
+    )
+
 
 class Client_Order_Details(db.Model) :
     co_id = db.Column(db.Integer, primary_key = True)
@@ -68,3 +73,133 @@ class Worker_Payment_Details(db.Model):
 
 
 
+
+
+class party_balance(db.Model):
+    """Running totals per client/worker, kept in step with the ledger tables.
+
+    For workers ``total_ordered`` holds the value of work done and
+    ``total_paid`` the payouts, so ``due_amount`` is what we still owe them.
+    """
+    cw_id = db.Column(db.Integer, db.ForeignKey('client_workers.cw_id'), primary_key=True)
+    total_ordered = db.Column(db.Integer, nullable = False, default = 0)
+    total_paid = db.Column(db.Integer, nullable = False, default = 0)
+    due_amount = db.Column(db.Integer, db.Computed('total_ordered - total_paid'))
+    last_activity = db.Column(db.Date)
+
+
+
+class raw_material_monthly(db.Model):
+    """Raw-material spend per calendar month and item (month = first day)."""
+    month = db.Column(db.Date, primary_key=True)
+    item = db.Column(db.String(100), primary_key=True)
+    quantity = db.Column(db.Integer, nullable = False, default = 0)
+    amount = db.Column(db.Integer, nullable = False, default = 0)
+    entries = db.Column(db.Integer, nullable = False, default = 0)
+
+
+
+class ledger_rollup(db.Model):
+    """Daily and monthly totals per metric (sales, receipts, worker_payouts, raw_material_spend)."""
+    period = db.Column(db.String(10), primary_key=True)    # 'day' or 'month'
+    period_start = db.Column(db.Date, primary_key=True)
+    metric = db.Column(db.String(50), primary_key=True)
+    amount = db.Column(db.Integer, nullable = False, default = 0)
+    entries = db.Column(db.Integer, nullable = False, default = 0)
+
+
+class job_lock(db.Model):
+    """Lease held by the process currently allowed to run a scheduled job."""
+    name = db.Column(db.String(100), primary_key=True)
+    holder = db.Column(db.String(200), nullable = False)
+    expires_at = db.Column(db.DateTime, nullable = False)
+    last_slot = db.Column(db.DateTime)      # scheduled fire time (UTC) of the last run taken
+
+
+class job_run(db.Model):
+    run_id = db.Column(db.Integer, primary_key=True)
+    job = db.Column(db.String(100), nullable = False, index = True)
+    holder = db.Column(db.String(200), nullable = False)
+    started_at = db.Column(db.DateTime, nullable = False)
+    finished_at = db.Column(db.DateTime)
+    duration_ms = db.Column(db.Float)
+    status = db.Column(db.String(20), nullable = False)     # running / success / failed
+    detail = db.Column(db.String(500))
+
+
+# one row per tracked table, bumped in the same transaction as each write (ETags)
+class change_counter(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable = False, default = 0)
+
+
+# one row per submitted write form, so a resubmission is not inserted twice
+class idempotency_key(db.Model):
+    key = db.Column(db.String(32), primary_key=True)
+    endpoint = db.Column(db.String(100), nullable = False)
+    created_at = db.Column(db.DateTime, nullable = False, index = True)
+
+
+# closed financial periods; everything dated on or before period_end is archived
+class period_close(db.Model):
+    period_end = db.Column(db.Date, primary_key=True)
+    closed_at = db.Column(db.DateTime, nullable = False)
+    rows_archived = db.Column(db.Integer, nullable = False, default = 0)
+
+
+# per party, the ledger totals archived by one period close (carried forward)
+class opening_balance(db.Model):
+    cw_id = db.Column(db.Integer, db.ForeignKey('client_workers.cw_id'), primary_key=True)
+    period_end = db.Column(db.Date, primary_key=True)
+    total_ordered = db.Column(db.Integer, nullable = False, default = 0)
+    total_paid = db.Column(db.Integer, nullable = False, default = 0)
+    last_activity = db.Column(db.Date)
+
+
+# statements / reports built in the background (app.report_jobs), downloaded when done
+class report_job(db.Model):
+    job_id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(50), nullable = False)
+    params = db.Column(db.Text, nullable = False)          # JSON
+    cache_key = db.Column(db.String(40), nullable = False, index = True)
+    status = db.Column(db.String(20), nullable = False)    # queued / running / done / failed
+    created_at = db.Column(db.DateTime, nullable = False, index = True)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    holder = db.Column(db.String(200))
+    file_name = db.Column(db.String(200))
+    detail = db.Column(db.String(500))
+
+
+# ---------------- INDEXES ----------------
+# Statements filter on cw_id and list newest first; materials list by date.
+db.Index('ix_client_order_cw_date', Client_Order_Details.cw_id, Client_Order_Details.date.desc())
+db.Index('ix_client_payment_cw_date', client_payment_details.cw_id, client_payment_details.date.desc())
+db.Index('ix_worker_work_cw_date', Worker_work_Details.cw_id, Worker_work_Details.date.desc())
+db.Index('ix_worker_payment_cw_date', Worker_Payment_Details.cw_id, Worker_Payment_Details.date.desc())
+db.Index('ix_raw_material_date', raw_material.date)
+
+
+# ---------------- ARCHIVE ----------------
+def _archive_of(model):
+    """Plain copy of a ledger table (computed columns stored as values)."""
+    table = db.Table(
+        model.__tablename__ + "_archive",
+        *[
+            db.Column(c.name, c.type, primary_key=c.primary_key, autoincrement=False, nullable=c.nullable)
+            for c in model.__table__.columns
+        ],
+    )
+    if "cw_id" in table.c:
+        db.Index(f"ix_{table.name}_cw_date", table.c.cw_id, table.c.date.desc())
+    else:
+        db.Index(f"ix_{table.name}_date", table.c.date)
+    return table
+
+
+# live ledger model -> its archive table
+ledger_archives = {
+    model: _archive_of(model)
+    for model in (Client_Order_Details, client_payment_details, Worker_work_Details,
+                  Worker_Payment_Details, raw_material)
+}
@@ -0,0 +1,68 @@
+"""Keyset (cursor) pagination helpers.
+
+Pages are addressed by the sort key of the last (or first) row shown rather
+than by OFFSET, so page N costs the same as page 1.  Cursors are opaque
+url-safe strings holding the sort key values.
+"""
+import base64
+import json
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, types):
+    """Return the list of key values in ``token``, or None if it is missing/garbled.
+
+    ``types`` is the expected type of each value, in order; a token with a
+    different number of values or any other type counts as garbled.  An int
+    passes for a float.
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        return None
+    if not isinstance(values, list) or len(values) != len(types):
+        return None
+    if not all(_is_type(value, expected) for value, expected in zip(values, types)):
+        return None
+    return values
+
+
+def _is_type(value, expected):
+    if isinstance(value, bool):
+        return False
+    if expected is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, expected)
+
+
+class KeysetPage:
+    """One page of rows plus the cursors needed to move either way."""
+
+    def __init__(self, items, total, has_next, has_prev, key):
+        self.items = items
+        self.total = total
+        self.has_next = has_next
+        self.has_prev = has_prev
+        self.next_cursor = encode_cursor(key(items[-1])) if has_next and items else None
+        self.prev_cursor = encode_cursor(key(items[0])) if has_prev and items else None
+
+    @classmethod
+    def from_rows(cls, rows, per_page, backwards, had_cursor, key, total=None):
+        """Build a page from a query that fetched ``per_page + 1`` rows.
+
+        ``backwards`` queries run in reverse sort order (for "previous"
+        links) and are flipped back here.
+        """
+        more = len(rows) > per_page
+        rows = list(rows[:per_page])
+        if backwards:
+            rows.reverse()
+            return cls(rows, total, has_next=had_cursor, has_prev=more, key=key)
+        return cls(rows, total, has_next=more, has_prev=had_cursor, key=key)
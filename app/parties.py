@@ -0,0 +1,131 @@
+"""Process-local directory of client/worker names.
+
+Every add_* route resolves a party name to its ``cw_id`` and the party
+pickers ask for name suggestions.  Both read this directory instead of
+querying ``client_workers`` each time.  ``add_client`` / ``add_worker``
+call ``invalidate()`` after committing; other workers pick new parties up
+when their copy expires (``PARTY_CACHE_TTL``) or when a lookup misses.
+"""
+import bisect
+import threading
+import time
+from collections import namedtuple
+from flask import current_app
+from sqlalchemy import text
+from app import db
+from app.models import client_workers
+
+# a lookup miss reloads at most this often, so bad names cannot cause a reload storm
+MISS_RELOAD_INTERVAL = 2.0
+
+# ids: (name, status) -> cw_id; names: status -> sorted names;
+# prefix: status -> sorted [(lowercased name, name)] for bisecting
+_Snapshot = namedtuple("_Snapshot", "ids names prefix")
+
+
+class PartyDirectory:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._loaded_at = 0.0
+
+    def _load(self):
+        rows = db.session.execute(
+            db.select(client_workers.cw_id, client_workers.client_name, client_workers.status)
+            .order_by(client_workers.client_name)
+        ).all()
+        ids, names, prefix = {}, {}, {}
+        for cw_id, name, status in rows:
+            # keep the first row when a name is repeated, like .first() did
+            ids.setdefault((name, status), cw_id)
+            names.setdefault(status, []).append(name)
+            prefix.setdefault(status, []).append((name.lower(), name))
+        for entries in prefix.values():
+            entries.sort()
+        snapshot = _Snapshot(ids, names, prefix)
+        with self._lock:
+            self._snapshot = snapshot
+            self._loaded_at = time.monotonic()
+        return snapshot
+
+    def _current(self):
+        with self._lock:
+            snapshot, loaded_at = self._snapshot, self._loaded_at
+        ttl = current_app.config.get("PARTY_CACHE_TTL", 300)
+        if snapshot is None or time.monotonic() - loaded_at > ttl:
+            snapshot = self._load()
+        return snapshot
+
+    def lookup(self, name, status):
+        """Return the cw_id for ``name`` with ``status``, or None."""
+        cw_id = self._current().ids.get((name, status))
+        if cw_id is None and time.monotonic() - self._loaded_at > MISS_RELOAD_INTERVAL:
+            # maybe added by another worker since we loaded
+            cw_id = self._load().ids.get((name, status))
+        return cw_id
+
+    def names(self, status):
+        """Sorted names of every party with ``status``."""
+        return self._current().names.get(status, [])
+
+    def suggest(self, term, status, limit=10):
+        """Names starting with ``term`` first, then names containing it."""
+        term = term.strip().lower()
+        entries = self._current().prefix.get(status, [])
+        if not term:
+            return [name for _, name in entries[:limit]]
+
+        start = bisect.bisect_left(entries, (term,))
+        found = []
+        for lowered, name in entries[start:]:
+            if not lowered.startswith(term) or len(found) >= limit:
+                break
+            found.append(name)
+
+        if len(found) < limit:
+            seen = set(found)
+            for lowered, name in entries:
+                if term in lowered and name not in seen:
+                    found.append(name)
+                    if len(found) >= limit:
+                        break
+        return found
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+
+party_directory = PartyDirectory()
+
+
+# ---------------- TRIGRAM SEARCH (PostgreSQL) ----------------
+TRIGRAM_SEARCH_SQL = """
+    SELECT client_name
+    FROM client_workers
+    WHERE status = :status AND (client_name ILIKE :prefix OR client_name % :term)
+    ORDER BY client_name ILIKE :prefix DESC, similarity(client_name, :term) DESC, client_name
+    LIMIT :limit
+"""
+
+_trigram_available = None
+
+
+def trigram_available():
+    """True when the database is PostgreSQL with pg_trgm installed (checked once)."""
+    global _trigram_available
+    if _trigram_available is None:
+        _trigram_available = db.engine.dialect.name == "postgresql" and db.session.execute(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        ).first() is not None
+    return _trigram_available
+
+
+def search_parties(term, status, limit=10):
+    """Top ``limit`` party names matching ``term`` by prefix or fuzzy match."""
+    if term.strip() and trigram_available():
+        escaped = term.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return db.session.execute(text(TRIGRAM_SEARCH_SQL), {
+            "status": status, "term": term.strip(), "prefix": escaped + "%", "limit": limit,
+        }).scalars().all()
+    return party_directory.suggest(term, status, limit)
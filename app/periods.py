@@ -0,0 +1,96 @@
+"""Closing financial periods.
+
+``close_period(period_end)`` moves every ledger and raw-material row dated
+on or before ``period_end`` into the matching ``*_archive`` table and
+writes one ``opening_balance`` row per party with the totals it moved, so
+``party_balance`` (and its rebuild from the ledgers) stays the same while
+the live tables only hold the open period.  Archived rows stay readable:
+statements take ``?archived=1`` and the rollup rebuilds read live and
+archive together.  Entries dated inside a closed period are refused.
+"""
+from datetime import date, datetime
+from sqlalchemy import inspect as sa_inspect, text
+from app import db
+from app.changes import bump
+from app.models import ledger_archives, opening_balance, period_close
+
+# rows per party being closed: orders/work count as ordered, payments as paid
+CLOSING_TOTALS_SQL = """
+    INSERT INTO opening_balance (cw_id, period_end, total_ordered, total_paid, last_activity)
+    SELECT cw_id, :period_end, SUM(ordered), SUM(paid), MAX(date)
+    FROM (
+        SELECT cw_id, COALESCE(total_amount, 0) AS ordered, 0 AS paid, date
+        FROM client__order__details WHERE date <= :period_end
+        UNION ALL
+        SELECT cw_id, COALESCE(total_amount, 0), 0, date
+        FROM worker_work__details WHERE date <= :period_end
+        UNION ALL
+        SELECT cw_id, 0, COALESCE(amount, 0), date
+        FROM client_payment_details WHERE date <= :period_end
+        UNION ALL
+        SELECT cw_id, 0, COALESCE(amount, 0), date
+        FROM worker__payment__details WHERE date <= :period_end
+    ) closing
+    GROUP BY cw_id
+"""
+
+
+def closed_through():
+    """The last closed period_end, or None if nothing has been closed."""
+    return db.session.execute(db.select(db.func.max(period_close.period_end))).scalar()
+
+
+def closed_period_error(day):
+    """Message for an entry dated inside a closed period, else None."""
+    if isinstance(day, datetime):
+        day = day.date()
+    last = closed_through()
+    if last is not None and day <= last:
+        return f"{day:%d/%m/%Y} falls in a closed period (closed through {last:%d/%m/%Y})"
+    return None
+
+
+def has_closed_periods(conn=None):
+    """True once a period has been closed (safe before the tables exist)."""
+    conn = conn if conn is not None else db.session.connection()
+    if not sa_inspect(conn).has_table("period_close"):
+        return False
+    return conn.execute(text("SELECT 1 FROM period_close LIMIT 1")).first() is not None
+
+
+def carried_forward(cw_id):
+    """``(ordered, paid)`` carried into the open period for one party."""
+    return db.session.execute(
+        db.select(
+            db.func.coalesce(db.func.sum(opening_balance.total_ordered), 0),
+            db.func.coalesce(db.func.sum(opening_balance.total_paid), 0),
+        ).where(opening_balance.cw_id == cw_id)
+    ).one()
+
+
+def close_period(period_end):
+    """Archive everything dated up to ``period_end``; return rows moved per table. Caller commits."""
+    last = closed_through()
+    if last is not None and period_end <= last:
+        raise ValueError(f"periods are already closed through {last.isoformat()}")
+    if period_end >= date.today():
+        raise ValueError("only a period that has already ended can be closed")
+
+    params = {"period_end": period_end}
+    db.session.execute(text(CLOSING_TOTALS_SQL), params)
+
+    moved = {}
+    for model, archive in ledger_archives.items():
+        live = model.__table__
+        columns = [c.name for c in archive.c]
+        db.session.execute(
+            archive.insert().from_select(columns, db.select(*[live.c[name] for name in columns])
+                                         .where(live.c.date <= period_end))
+        )
+        moved[live.name] = db.session.execute(live.delete().where(live.c.date <= period_end)).rowcount
+
+    db.session.add(period_close(period_end=period_end, closed_at=datetime.utcnow(),
+                                rows_archived=sum(moved.values())))
+    # statements and the raw-material list now show fewer rows
+    bump("party_balance", "raw_material")
+    return moved
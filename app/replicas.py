@@ -0,0 +1,172 @@
+"""Read-replica routing.
+
+``DATABASE_REPLICA_URLS`` (comma separated) adds one bind per replica
+(``replica_1``, ``replica_2``, ...).  GET/HEAD requests to the blueprints
+in ``READ_REPLICA_BLUEPRINTS`` read from a healthy replica picked at
+random; everything else, and anything a request flushes, goes to the
+primary.  After a request that commits a write, the browser is pinned to
+the primary for ``READ_REPLICA_PIN_SECONDS`` so the redirect that follows
+shows the new rows.
+
+Each process checks its replicas at most every
+``READ_REPLICA_CHECK_INTERVAL`` seconds.  A replica that cannot be reached,
+errors with a lost connection, or (on PostgreSQL) replays more than
+``READ_REPLICA_MAX_LAG`` seconds behind is skipped until a later check
+passes; with none left, reads fall back to the primary.  Replicas must be
+the same database engine as the primary.  ``/metrics/replicas`` shows the
+last check of each.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from flask import current_app, g, has_app_context, has_request_context, jsonify, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+REPLICA_PREFIX = "replica_"
+PIN_KEY = "_primary_until"
+SAFE_METHODS = ("GET", "HEAD")
+
+# seconds of replay lag; 0 when the replica has replayed everything it received
+LAG_SQL = {
+    "postgresql": """
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END
+    """,
+}
+
+
+def replica_binds(urls, environ=os.environ):
+    """SQLALCHEMY_BINDS entries for the comma-separated replica ``urls``."""
+    from app.engine import engine_options
+
+    binds = {}
+    for number, url in enumerate((u.strip() for u in (urls or "").split(",") if u.strip()), start=1):
+        options = engine_options(url, environ)
+        if options.get("poolclass") is not None:
+            # pool metrics describe the primary only
+            options["poolclass"] = QueuePool
+        if make_url(url).get_backend_name() == "postgresql":
+            connect_args = dict(options.get("connect_args", {}))
+            connect_args["connect_timeout"] = int(environ.get("READ_REPLICA_CONNECT_TIMEOUT", 3))
+            options["connect_args"] = connect_args
+        binds[f"{REPLICA_PREFIX}{number}"] = {"url": url, **options}
+    return binds
+
+
+class RoutingSession(Session):
+    """Session that reads from the replica chosen for this request, if any."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context():
+            replica = g.get("read_replica")
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaHealth:
+    """Last health check per replica bind, refreshed lazily by whoever needs it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._status = {}
+
+    def healthy(self, engines, interval, max_lag):
+        """Names of the replicas currently fit to serve reads."""
+        now = time.monotonic()
+        with self._lock:
+            stale = [name for name in engines
+                     if now - self._status.get(name, {}).get("checked_at", float("-inf")) >= interval]
+            for name in stale:
+                # claim the check so concurrent requests keep using the last result
+                self._status.setdefault(name, {"healthy": False, "lag": None, "error": None})["checked_at"] = now
+        for name in stale:
+            self._store(name, _check(engines[name], max_lag))
+        with self._lock:
+            return [name for name in engines if self._status.get(name, {}).get("healthy")]
+
+    def mark_down(self, name, error):
+        self._store(name, {"healthy": False, "lag": None, "error": error})
+
+    def _store(self, name, result):
+        with self._lock:
+            self._status.setdefault(name, {"checked_at": time.monotonic()}).update(result)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: {"healthy": s.get("healthy"), "lag_seconds": s.get("lag"), "error": s.get("error")}
+                for name, s in self._status.items()
+            }
+
+
+replica_health = ReplicaHealth()
+
+
+def _check(engine, max_lag):
+    try:
+        with engine.connect() as conn:
+            lag = float(conn.execute(text(LAG_SQL.get(engine.dialect.name, "SELECT 0"))).scalar() or 0)
+    except Exception as exc:
+        logger.warning("replica %s unavailable: %s", engine.url.render_as_string(hide_password=True), exc)
+        return {"healthy": False, "lag": None, "error": str(exc)[:200]}
+    if lag > max_lag:
+        return {"healthy": False, "lag": round(lag, 3), "error": f"lagging {lag:.1f}s"}
+    return {"healthy": True, "lag": round(lag, 3), "error": None}
+
+
+def replica_engines():
+    db = current_app.extensions["sqlalchemy"]
+    return {key: engine for key, engine in db.engines.items()
+            if isinstance(key, str) and key.startswith(REPLICA_PREFIX)}
+
+
+def choose_read_replica():
+    """before_request: route this request's reads to a replica when allowed."""
+    config = current_app.config
+    if request.method not in SAFE_METHODS or request.blueprint not in config["READ_REPLICA_BLUEPRINTS"]:
+        return
+    if session.get(PIN_KEY, 0) > time.time():
+        return
+    engines = replica_engines()
+    if not engines:
+        return
+    names = replica_health.healthy(engines, config["READ_REPLICA_CHECK_INTERVAL"], config["READ_REPLICA_MAX_LAG"])
+    if names:
+        g.read_replica = engines[random.choice(names)]
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _pin_after_write(db_session):
+    # a write request committed; the redirect that follows must see it
+    if has_request_context() and request.method not in SAFE_METHODS and replica_engines():
+        session[PIN_KEY] = time.time() + current_app.config["READ_REPLICA_PIN_SECONDS"]
+
+
+def init_replicas(app):
+    from app.routes.tasks import login_required
+
+    app.before_request(choose_read_replica)
+
+    with app.app_context():
+        for name, engine in replica_engines().items():
+            def lost(context, name=name):
+                if context.is_disconnect or isinstance(context.sqlalchemy_exception, OperationalError):
+                    replica_health.mark_down(name, str(context.original_exception)[:200])
+            event.listen(engine, "handle_error", lost)
+
+    @login_required
+    def replica_status():
+        return jsonify(replica_health.snapshot())
+
+    app.add_url_rule("/metrics/replicas", "replica_metrics", replica_status)
@@ -0,0 +1,295 @@
+"""Statements and reports built in the background.
+
+``enqueue()`` stores a ``report_job`` row and hands it to this process's
+thread pool (REPORT_WORKERS threads), so the request that asked for it
+returns at once.  A worker claims a job by flipping it from ``queued`` to
+``running`` in one UPDATE, which lets the scheduler's ``report_jobs`` poll
+(every REPORT_POLL_SECONDS, in any process) pick up jobs a restarted
+process left behind without running any twice.  Running jobs older than
+REPORT_JOB_TIMEOUT are requeued.
+
+The finished file goes to REPORT_DIR as ``<job_id>.<ext>``.  A job's
+``cache_key`` covers its kind, its parameters and the change counters, so
+asking again for a report whose data has not changed returns the existing
+job instead of building it twice.  ``evict_report_files`` deletes jobs
+and files older than REPORT_TTL.
+"""
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from flask import current_app
+from app import db
+from app.changes import TRACKED, versions
+from app.engine import write_transaction
+from app.models import client_workers, report_job
+
+logger = logging.getLogger(__name__)
+
+PENDING = ("queued", "running")
+
+# attempts at recording a finished job before leaving it to the stuck-job requeue
+FINISH_ATTEMPTS = 3
+
+
+# ---------------- PARAMETERS ----------------
+def _date_param(params, key, required=False):
+    value = (params.get(key) or "").strip()
+    if not value:
+        if required:
+            raise ValueError(f"{key} date is required")
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        raise ValueError(f"bad {key} date '{value}', expected YYYY-MM-DD")
+
+
+def _statement_params(status):
+    def parse(params):
+        name = (params.get("name") or "").strip()
+        found = db.session.execute(
+            db.select(client_workers.cw_id).where(client_workers.client_name == name, client_workers.status == status)
+        ).first()
+        if not found:
+            raise ValueError(f"{status} '{name}' not found")
+        return {"name": name, "from": _date_param(params, "from"), "to": _date_param(params, "to")}
+    return parse
+
+
+def _period_params(params):
+    parsed = {"from": _date_param(params, "from", required=True), "to": _date_param(params, "to", required=True)}
+    if parsed["from"] > parsed["to"]:
+        raise ValueError("from must not be after to")
+    return parsed
+
+
+def _aging_params(params):
+    kind = params.get("type", "client")
+    if kind not in ("client", "worker"):
+        raise ValueError(f"unknown aging type '{kind}'")
+    return {"type": kind, "as_of": _date_param(params, "as_of") or date.today().isoformat()}
+
+
+# ---------------- BUILDERS ----------------
+def _statement_builder(items, payments):
+    def build(params, out):
+        # imported here so the rest of the app does not pay for openpyxl at boot
+        from openpyxl import Workbook
+        from app.periods import has_closed_periods
+        from app.routes.exports import export_query, iter_export_rows
+
+        date_from = params["from"] and date.fromisoformat(params["from"])
+        date_to = params["to"] and date.fromisoformat(params["to"])
+        sources = (True, False) if has_closed_periods() else (False,)
+
+        workbook = Workbook(write_only=True)
+        for title, export in (("Items", items), ("Payments", payments)):
+            sheet = workbook.create_sheet(title=title)
+            # archived entries first, so the sheet stays oldest first
+            for number, archived in enumerate(sources):
+                header, query = export_query(export, date_from, date_to, params["name"], archived)
+                if number == 0:
+                    sheet.append(list(header))
+                for row in iter_export_rows(query):
+                    sheet.append(list(row))
+        workbook.save(out)
+    return build
+
+
+def _write_csv(out, header, rows):
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(header)
+    writer.writerows(rows)
+    text.flush()
+    text.detach()
+
+
+def _build_period_summary(params, out):
+    from app.rollups import LEDGER_METRICS, rollup_series
+
+    date_from, date_to = date.fromisoformat(params["from"]), date.fromisoformat(params["to"])
+    months = {}
+    for metric in LEDGER_METRICS:
+        for month, amount, _ in rollup_series(metric, "month", date_from.replace(day=1), date_to):
+            months.setdefault(month, {})[metric] = amount
+    rows = [[month, *(months[month].get(metric, 0) for metric in LEDGER_METRICS)] for month in sorted(months)]
+    _write_csv(out, ["month", *LEDGER_METRICS], rows)
+
+
+def _build_aging(params, out):
+    from app.aging import AGING_BUCKETS, aging_report
+
+    status = "Client" if params["type"] == "client" else "Worker"
+    rows = aging_report(status, date.fromisoformat(params["as_of"]))
+    columns = ["client_name", *AGING_BUCKETS, "total"]
+    _write_csv(out, ["party", *AGING_BUCKETS.values(), "total"], [[r[c] for c in columns] for r in rows])
+
+
+# kind -> (label, file extension, parse/validate params, build(params, binary file))
+REPORT_KINDS = {
+    "client_statement": ("Client statement", "xlsx", _statement_params("Client"),
+                         _statement_builder("client_orders", "client_payments")),
+    "worker_statement": ("Worker statement", "xlsx", _statement_params("Worker"),
+                         _statement_builder("worker_work", "worker_payments")),
+    "period_summary": ("Monthly summary", "csv", _period_params, _build_period_summary),
+    "aging": ("Aging", "csv", _aging_params, _build_aging),
+}
+
+
+def download_name(job):
+    _, ext, _, _ = REPORT_KINDS[job.kind]
+    params = json.loads(job.params)
+    parts = [job.kind] + [str(v) for v in params.values() if v]
+    return "_".join(parts).replace(" ", "_").replace("/", "-") + "." + ext
+
+
+def report_path(job):
+    return os.path.join(current_app.config["REPORT_DIR"], f"{job.job_id}.{REPORT_KINDS[job.kind][1]}")
+
+
+# ---------------- QUEUE ----------------
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor(app):
+    # created lazily so it belongs to the worker process, not the gunicorn master
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=app.config["REPORT_WORKERS"], thread_name_prefix="report")
+        return _pool
+
+
+def _submit(app, job_id):
+    _executor(app).submit(_run, app, job_id).add_done_callback(
+        lambda future: _log_failure(future, job_id)
+    )
+
+
+def _log_failure(future, job_id):
+    # the executor would otherwise keep the exception to itself
+    error = future.exception()
+    if error is not None:
+        logger.error("report job %s crashed", job_id, exc_info=error)
+
+
+def enqueue(kind, raw_params):
+    """Queue ``kind`` for ``raw_params`` (or reuse an equal job); return the report_job. Commits."""
+    if kind not in REPORT_KINDS:
+        raise ValueError(f"unknown report '{kind}'")
+    params = REPORT_KINDS[kind][2](raw_params)
+    encoded = json.dumps(params, sort_keys=True)
+    cache_key = hashlib.sha1(repr((kind, encoded, versions(*TRACKED))).encode()).hexdigest()
+
+    existing = db.session.execute(
+        db.select(report_job)
+        .where(report_job.cache_key == cache_key, report_job.status.in_(PENDING + ("done",)))
+        .order_by(report_job.created_at.desc())
+        .limit(1)
+    ).scalar()
+    if existing is not None and (existing.status in PENDING or os.path.exists(report_path(existing))):
+        db.session.commit()
+        return existing
+
+    job = report_job(job_id=uuid.uuid4().hex, kind=kind, params=encoded, cache_key=cache_key,
+                     status="queued", created_at=datetime.utcnow())
+    db.session.add(job)
+    db.session.commit()
+    _submit(current_app._get_current_object(), job.job_id)
+    return job
+
+
+def _claim(job_id, holder):
+    claimed = db.session.execute(
+        db.update(report_job)
+        .where(report_job.job_id == job_id, report_job.status == "queued")
+        .values(status="running", started_at=datetime.utcnow(), holder=holder)
+    ).rowcount
+    db.session.commit()
+    return bool(claimed)
+
+
+def _run(app, job_id):
+    from app.jobs import holder_id
+
+    with app.app_context():
+        if not _claim(job_id, holder_id()):
+            return
+        job = db.session.get(report_job, job_id)
+        kind, params, path = job.kind, json.loads(job.params), report_path(job)
+        try:
+            _, _, _, build = REPORT_KINDS[kind]
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as out:
+                build(params, out)
+            os.replace(tmp, path)
+            status, detail = "done", None
+        except Exception as e:
+            logger.exception("report job %s (%s) failed", job_id, kind)
+            status, detail = "failed", f"{type(e).__name__}: {e}"[:500]
+        finally:
+            # end the build's read transaction; on SQLite it would block the update below
+            db.session.rollback()
+        _finish(job_id, status, detail)
+
+
+def _finish(job_id, status, detail):
+    """Record the outcome, retrying a few times (e.g. "database is locked")."""
+    for attempt in range(1, FINISH_ATTEMPTS + 1):
+        try:
+            with write_transaction():
+                job = db.session.get(report_job, job_id)
+                job.status = status
+                job.detail = detail
+                job.finished_at = datetime.utcnow()
+                job.file_name = download_name(job) if status == "done" else None
+                db.session.commit()
+            return
+        except Exception:
+            db.session.rollback()
+            logger.warning("could not record report job %s as %s (attempt %d of %d)",
+                           job_id, status, attempt, FINISH_ATTEMPTS, exc_info=True)
+            if attempt < FINISH_ATTEMPTS:
+                time.sleep(attempt)
+    logger.error("report job %s left running; it is requeued after REPORT_JOB_TIMEOUT", job_id)
+
+
+def poll_report_jobs(app):
+    """Requeue stuck jobs and start any queued ones this process can take."""
+    with app.app_context():
+        timeout = timedelta(seconds=app.config["REPORT_JOB_TIMEOUT"])
+        db.session.execute(
+            db.update(report_job)
+            .where(report_job.status == "running", report_job.started_at < datetime.utcnow() - timeout)
+            .values(status="queued", holder=None)
+        )
+        db.session.commit()
+        queued = db.session.execute(
+            db.select(report_job.job_id).where(report_job.status == "queued")
+            .order_by(report_job.created_at).limit(app.config["REPORT_WORKERS"])
+        ).scalars().all()
+    for job_id in queued:
+        _submit(app, job_id)
+
+
+def evict_reports(older_than):
+    """Delete jobs created before ``older_than`` and their files; return how many. Caller commits."""
+    old = db.session.execute(db.select(report_job).where(report_job.created_at < older_than)).scalars().all()
+    for job in old:
+        try:
+            os.remove(report_path(job))
+        except FileNotFoundError:
+            pass
+        db.session.delete(job)
+    return len(old)
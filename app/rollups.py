@@ -0,0 +1,169 @@
+"""Precomputed report tables.
+
+``raw_material_monthly`` has one row per (month, item).  ``add_raw_material``
+and the bulk importer update it in the same transaction as the insert, so
+the materials page and the dashboard read a handful of rollup rows instead
+of scanning ``raw_material``.
+
+``ledger_rollup`` holds daily and monthly sales, receipts, worker payouts
+and raw-material spend.  It is refreshed by the scheduled jobs in
+``app.jobs`` rather than on every write, so it can lag the ledgers by up
+to an hour.
+"""
+from datetime import date, timedelta
+from sqlalchemy import text
+from app import db
+from app.changes import bump
+from app.models import raw_material_monthly, ledger_rollup
+
+# metric -> (table, amount column)
+LEDGER_METRICS = {
+    "sales": ("client__order__details", "total_amount"),
+    "receipts": ("client_payment_details", "amount"),
+    "worker_payouts": ("worker__payment__details", "amount"),
+    "raw_material_spend": ("raw_material", "amount"),
+}
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def record_raw_material(item, on_date, quantity, amount):
+    """Add one purchase to its month/item rollup row."""
+    record_raw_materials({(month_start(on_date), item): (quantity, amount or 0, 1)})
+
+
+def record_raw_materials(totals):
+    """Apply ``{(month, item): (quantity, amount, entries)}`` to the rollup."""
+    for (month, item), (quantity, amount, entries) in totals.items():
+        result = db.session.execute(
+            db.update(raw_material_monthly)
+            .where(raw_material_monthly.month == month, raw_material_monthly.item == item)
+            .values(
+                quantity=raw_material_monthly.quantity + quantity,
+                amount=raw_material_monthly.amount + amount,
+                entries=raw_material_monthly.entries + entries,
+            )
+        )
+        if result.rowcount == 0:
+            db.session.add(raw_material_monthly(
+                month=month, item=item, quantity=quantity, amount=amount, entries=entries
+            ))
+    bump("raw_material")
+
+
+def raw_material_spend(date_from=None, date_to=None):
+    """Total spend over whole months between the two dates (inclusive)."""
+    query = db.select(db.func.coalesce(db.func.sum(raw_material_monthly.amount), 0))
+    if date_from:
+        query = query.where(raw_material_monthly.month >= month_start(date_from))
+    if date_to:
+        query = query.where(raw_material_monthly.month <= month_start(date_to))
+    return db.session.execute(query).scalar()
+
+
+def month_expression(dialect_name, column="date"):
+    if dialect_name == "postgresql":
+        return f"CAST(date_trunc('month', {column}) AS DATE)"
+    return f"date({column}, 'start of month')"
+
+
+def _target(conn):
+    """Statements run on ``conn`` (a migration's connection) or the session."""
+    if conn is None:
+        return db.session, db.engine.dialect.name
+    return conn, conn.dialect.name
+
+
+def rebuild_raw_material_rollup(conn=None):
+    """Recompute the monthly rollup from ``raw_material``. Caller commits."""
+    conn, dialect = _target(conn)
+    month = month_expression(dialect)
+    source = _with_archive(conn, "raw_material", "date, item, quantity, amount")
+    conn.execute(text("DELETE FROM raw_material_monthly"))
+    conn.execute(text(f"""
+        INSERT INTO raw_material_monthly (month, item, quantity, amount, entries)
+        SELECT {month}, item, SUM(quantity), SUM(amount), COUNT(*)
+        FROM {source}
+        GROUP BY {month}, item
+    """))
+    if conn is db.session:
+        # migrations run before change_counter exists and seed it themselves
+        bump("raw_material")
+
+
+def refresh_ledger_rollup(first_day, last_day, conn=None):
+    """Recompute daily rows for ``first_day..last_day`` and the months they touch.
+
+    Monthly rows are summed from the daily ones, so the whole of each
+    touched month is refreshed at the day level first.  Caller commits.
+    """
+    conn, dialect = _target(conn)
+    span = {"a": month_start(first_day), "b": _month_end(last_day)}
+
+    conn.execute(text(
+        "DELETE FROM ledger_rollup WHERE period_start BETWEEN :a AND :b"
+    ), span)
+    for metric, (table, column) in LEDGER_METRICS.items():
+        source = _with_archive(conn, table, f"date, {column}")
+        conn.execute(text(f"""
+            INSERT INTO ledger_rollup (period, period_start, metric, amount, entries)
+            SELECT 'day', date, :metric, COALESCE(SUM({column}), 0), COUNT(*)
+            FROM {source}
+            WHERE date BETWEEN :a AND :b
+            GROUP BY date
+        """), {"metric": metric, **span})
+
+    month = month_expression(dialect, "period_start")
+    conn.execute(text(f"""
+        INSERT INTO ledger_rollup (period, period_start, metric, amount, entries)
+        SELECT 'month', {month}, metric, SUM(amount), SUM(entries)
+        FROM ledger_rollup
+        WHERE period = 'day' AND period_start BETWEEN :a AND :b
+        GROUP BY {month}, metric
+    """), span)
+
+
+def rebuild_ledger_rollup(conn=None):
+    """Recompute ``ledger_rollup`` over the whole ledger history. Caller commits."""
+    executor, _ = _target(conn)
+    bounds = [
+        executor.execute(text(f"SELECT MIN(date), MAX(date) FROM {_with_archive(executor, table, 'date')}")).one()
+        for table, _ in LEDGER_METRICS.values()
+    ]
+    days = [_as_date(d) for pair in bounds for d in pair if d is not None]
+    executor.execute(text("DELETE FROM ledger_rollup"))
+    if days:
+        refresh_ledger_rollup(min(days), max(days), conn)
+
+
+def rollup_series(metric, period="month", date_from=None, date_to=None):
+    """``[(period_start, amount, entries)]`` for one metric, oldest first."""
+    query = db.select(ledger_rollup.period_start, ledger_rollup.amount, ledger_rollup.entries).where(
+        ledger_rollup.period == period, ledger_rollup.metric == metric
+    )
+    if date_from:
+        query = query.where(ledger_rollup.period_start >= date_from)
+    if date_to:
+        query = query.where(ledger_rollup.period_start <= date_to)
+    return db.session.execute(query.order_by(ledger_rollup.period_start)).all()
+
+
+def _with_archive(conn, table, columns):
+    """``table``, or it together with its archive once a period has been closed."""
+    from app.periods import has_closed_periods
+
+    if not has_closed_periods(conn if conn is not db.session else None):
+        return table
+    return f"(SELECT {columns} FROM {table} UNION ALL SELECT {columns} FROM {table}_archive) {table}"
+
+
+def _month_end(day):
+    next_month = date(day.year + day.month // 12, day.month % 12 + 1, 1)
+    return next_month - timedelta(days=1)
+
+
+def _as_date(value):
+    # SQLite hands back MIN/MAX(date) as text
+    return date.fromisoformat(value[:10]) if isinstance(value, str) else value
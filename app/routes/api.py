@@ -0,0 +1,139 @@
+from datetime import date, datetime
+from flask import Blueprint, jsonify, request
+from app import db
+from app.changes import TRACKED, conditional
+from app.models import raw_material
+from app.pagination import KeysetPage, decode_cursor
+from app.rollups import raw_material_spend
+from app.routes.tasks import (
+    login_required,
+    load_dashboard,
+    party_page,
+    statement_json,
+    STATEMENT_COUNTERS,
+)
+
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+PARTY_COUNTERS = ("client_workers", "party_balance")
+RAW_MATERIAL_PAGE_SIZE = 50
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+# ---------------- DASHBOARD ----------------
+@api_bp.route("/dashboard")
+@login_required
+def dashboard():
+    def build():
+        # not dashboard_cache: it may lag the counters the ETag is built from,
+        # and an unchanged dashboard is answered with a 304 before this runs
+        data = load_dashboard()
+        materials = [{**m, "date": _iso(m["date"])} for m in data["recent_materials"]]
+        return jsonify({**data, "recent_materials": materials})
+
+    return conditional("dashboard", TRACKED, build)
+
+
+# ---------------- PARTIES ----------------
+def _party_list(status):
+    search = request.args.get("search", "").strip()
+    after, before = request.args.get("after"), request.args.get("before")
+
+    def build():
+        page = party_page(status, search, after=after, before=before)
+        return jsonify({
+            "total": page.total,
+            "items": [{"name": p["client_name"], "due_amount": p["due_amount"]} for p in page.items],
+            "next": page.next_cursor,
+            "prev": page.prev_cursor,
+        })
+
+    return conditional("parties", PARTY_COUNTERS, build, status, search, after, before)
+
+
+@api_bp.route("/clients")
+@login_required
+def clients():
+    return _party_list("Client")
+
+
+@api_bp.route("/workers")
+@login_required
+def workers():
+    return _party_list("Worker")
+
+
+@api_bp.route("/clients/<name>/statement")
+@login_required
+def client_statement(name):
+    return conditional("client_statement", STATEMENT_COUNTERS, lambda: statement_json("Client", name),
+                       name, request.args.get("section"), request.args.get("after"),
+                       request.args.get("archived"))
+
+
+@api_bp.route("/workers/<name>/statement")
+@login_required
+def worker_statement(name):
+    return conditional("worker_statement", STATEMENT_COUNTERS, lambda: statement_json("Worker", name),
+                       name, request.args.get("section"), request.args.get("after"),
+                       request.args.get("archived"))
+
+
+# ---------------- RAW MATERIALS ----------------
+def raw_material_page(search, after, per_page=RAW_MATERIAL_PAGE_SIZE):
+    """Newest-first raw materials, keyed on (date, raw_id)."""
+    query = db.select(raw_material)
+    if search:
+        query = query.where(raw_material.item.ilike(f"%{search}%"))
+
+    cursor = decode_cursor(after, (str, int))
+    if cursor:
+        try:
+            last_date, last_id = date.fromisoformat(cursor[0]), int(cursor[1])
+        except (TypeError, ValueError):
+            cursor = None
+        else:
+            query = query.where(db.or_(
+                raw_material.date < last_date,
+                db.and_(raw_material.date == last_date, raw_material.raw_id < last_id),
+            ))
+    else:
+        cursor = None
+
+    rows = db.session.execute(
+        query.order_by(raw_material.date.desc(), raw_material.raw_id.desc()).limit(per_page + 1)
+    ).scalars().all()
+    return KeysetPage.from_rows(
+        rows,
+        per_page,
+        backwards=False,
+        had_cursor=cursor is not None,
+        key=lambda r: (r.date.isoformat(), r.raw_id),
+    )
+
+
+@api_bp.route("/raw_materials")
+@login_required
+def raw_materials():
+    search = request.args.get("search", "").strip()
+    after = request.args.get("after")
+
+    def build():
+        page = raw_material_page(search, after)
+        now = datetime.now()
+        return jsonify({
+            "total_inventory_value": raw_material_spend(),
+            "monthly_purchase": raw_material_spend(now, now),
+            "items": [
+                {"item": m.item, "date": m.date.isoformat(), "quantity": m.quantity,
+                 "price": m.price, "amount": m.amount}
+                for m in page.items
+            ],
+            "next": page.next_cursor,
+        })
+
+    # "this month" changes at midnight on the 1st without any write
+    return conditional("raw_materials", ("raw_material",), build, search, after, date.today().strftime("%Y-%m"))
@@ -0,0 +1,274 @@
+import csv
+import io
+import re
+import unicodedata
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+from flask import Blueprint, Response, request, abort, stream_with_context
+from app import db
+from app.models import (
+    raw_material,
+    client_payment_details,
+    Client_Order_Details,
+    client_workers,
+    Worker_work_Details,
+    Worker_Payment_Details,
+    ledger_archives
+)
+from app.routes.tasks import login_required
+
+export_bp = Blueprint('exports', __name__, url_prefix='/export')
+
+# rows pulled from the server-side cursor per round trip
+EXPORT_BATCH_SIZE = 1000
+
+# export name -> (model, exported columns, has a party column)
+EXPORTS = {
+    "client_orders": (Client_Order_Details, ("date", "item", "description", "quantity", "price", "total_amount"), True),
+    "client_payments": (client_payment_details, ("date", "mode", "description", "amount"), True),
+    "worker_work": (Worker_work_Details, ("date", "item", "description", "quantity", "price", "total_amount"), True),
+    "worker_payments": (Worker_Payment_Details, ("date", "mode", "description", "amount"), True),
+    "raw_materials": (raw_material, ("date", "item", "quantity", "price", "amount"), False),
+}
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        abort(400, f"Bad date '{value}', expected YYYY-MM-DD")
+
+
+def export_query(name, date_from=None, date_to=None, party=None, archived=False):
+    """Build the select for one export, oldest first, with optional filters.
+
+    ``archived`` exports the entries moved out by closed periods instead.
+    """
+    model, columns, has_party = EXPORTS[name]
+    source = ledger_archives[model] if archived else model.__table__
+    selected = [source.c[col] for col in columns]
+
+    if has_party:
+        query = (
+            db.select(client_workers.client_name.label("party"), *selected)
+            .join(client_workers, client_workers.cw_id == source.c.cw_id)
+        )
+        if party:
+            query = query.where(client_workers.client_name == party)
+        header = ("party",) + columns
+    else:
+        query = db.select(*selected)
+        header = columns
+
+    if date_from:
+        query = query.where(source.c.date >= date_from)
+    if date_to:
+        query = query.where(source.c.date <= date_to)
+
+    pk = source.c[model.__mapper__.primary_key[0].key]
+    return header, query.order_by(source.c.date, pk)
+
+
+def iter_export_rows(query):
+    """Yield result rows from a server-side cursor, a batch at a time."""
+    result = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for partition in result.partitions():
+        yield from partition
+
+
+def _attachment(response, filename):
+    """Content-Disposition for ``filename``, with an RFC 5987 copy if it is not ASCII."""
+    try:
+        filename.encode("ascii")
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode("ascii")
+        names = {"filename": simple, "filename*": f"UTF-8''{quote(filename, safe='!#$&+-.^_`|~')}"}
+    else:
+        names = {"filename": filename}
+    response.headers.set("Content-Disposition", "attachment", **names)
+    return response
+
+
+def _csv_response(filename, header, query):
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        for row in iter_export_rows(query):
+            writer.writerow(row)
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    response = Response(stream_with_context(generate()), mimetype="text/csv")
+    return _attachment(response, f"{filename}.csv")
+
+
+# ---------------- XLSX ----------------
+# A minimal workbook: one sheet of inline strings, numbers and dates (style 1).
+# The sheet is written straight into the zip as rows come off the cursor, so
+# the download starts at once and nothing is built up front.
+XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '<Relationship Id="rId2" Target="styles.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/>'
+        '</Relationships>'
+    ),
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{title}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+)
+
+XLSX_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+XLSX_SHEET_TAIL = '</sheetData></worksheet>'
+
+# characters XML 1.0 cannot carry at all
+XML_ILLEGAL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+EXCEL_EPOCH = date(1899, 12, 30)
+
+
+def _column_letter(index):
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _xlsx_cell(ref, value):
+    if value is None:
+        return ""
+    if isinstance(value, date):
+        return f'<c r="{ref}" s="1"><v>{(value - EXCEL_EPOCH).days}</v></c>'
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    text = escape(XML_ILLEGAL.sub("", str(value)))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(number, values, columns):
+    cells = "".join(_xlsx_cell(f"{columns[i]}{number}", value) for i, value in enumerate(values))
+    return f'<row r="{number}">{cells}</row>'
+
+
+class _ZipSink:
+    """Write-only file the zip is written into; ``take()`` hands over what has piled up."""
+
+    def __init__(self):
+        self._chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self.size = 0
+        return data
+
+
+def _xlsx_response(filename, header, query):
+    # sheet names are at most 31 characters, without \ / ? * [ ] :
+    title = escape(XML_ILLEGAL.sub("", re.sub(r"[\\/?*\[\]:]", "_", filename))[:31], {'"': "&quot;"})
+    columns = [_column_letter(i) for i in range(len(header))]
+
+    def generate():
+        sink = _ZipSink()
+        # zipfile writes data descriptors when it cannot seek back, so this streams
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as workbook:
+            for name, part in XLSX_PARTS.items():
+                workbook.writestr(name, part)
+            workbook.writestr("xl/workbook.xml", XLSX_WORKBOOK.format(title=title))
+            with workbook.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+                sheet.write(XLSX_SHEET_HEAD.encode())
+                sheet.write(_xlsx_row(1, header, columns).encode())
+                for number, row in enumerate(iter_export_rows(query), start=2):
+                    sheet.write(_xlsx_row(number, row, columns).encode("utf-8"))
+                    if sink.size > 64 * 1024:
+                        yield sink.take()
+                sheet.write(XLSX_SHEET_TAIL.encode())
+        yield sink.take()
+
+    response = Response(stream_with_context(generate()),
+                        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    return _attachment(response, f"{filename}.xlsx")
+
+
+# ---------------- EXPORT ----------------
+@export_bp.route("/<name>.<fmt>")
+@login_required
+def export_table(name, fmt):
+    if name not in EXPORTS or fmt not in ("csv", "xlsx"):
+        abort(404)
+
+    date_from = _parse_date(request.args.get("from"))
+    date_to = _parse_date(request.args.get("to"))
+    party = request.args.get("party", "").strip() or None
+
+    archived = request.args.get("archived") == "1"
+
+    header, query = export_query(name, date_from, date_to, party, archived)
+
+    filename = "_".join(str(part) for part in (name, party, date_from, date_to, archived and "archived") if part)
+    if fmt == "xlsx":
+        return _xlsx_response(filename, header, query)
+    return _csv_response(filename, header, query)
@@ -0,0 +1,32 @@
+import io
+from flask import Blueprint, render_template, request, flash
+from app.idempotency import idempotent
+from app.importer import IMPORT_KINDS, import_csv
+from app.routes.tasks import login_required
+
+import_bp = Blueprint('imports', __name__)
+
+
+# ---------------- BULK IMPORT ----------------
+@import_bp.route("/import", methods=["GET", "POST"])
+@login_required
+# import_csv commits chunk by chunk, so the key must not ride on the first chunk's transaction
+@idempotent("imports.bulk_import", commit_claim=True)
+def bulk_import():
+    report = None
+
+    if request.method == "POST":
+        kind = request.form.get("kind")
+        upload = request.files.get("file")
+
+        if kind not in IMPORT_KINDS or not upload or not upload.filename:
+            flash("⚠️ Please choose what to import and a CSV file!", "warning")
+        else:
+            stream = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+            report = import_csv(kind, stream)
+            if report.inserted:
+                flash(f"✅ Imported {report.inserted} rows.", "success")
+            if report.errors:
+                flash(f"⚠️ {len(report.errors)} rows were not imported, see below.", "warning")
+
+    return render_template("import.html", kinds=IMPORT_KINDS, report=report)
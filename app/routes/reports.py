@@ -0,0 +1,71 @@
+import os
+from datetime import date, datetime
+from flask import Blueprint, render_template, request, abort, flash, redirect, url_for, send_file
+from app import db
+from app.aging import AGING_BUCKETS, aging_report
+from app.idempotency import idempotent
+from app.models import report_job
+from app.report_jobs import PENDING, REPORT_KINDS, enqueue, report_path
+from app.routes.tasks import login_required
+
+report_bp = Blueprint('reports', __name__, url_prefix='/reports')
+
+AGING_TYPES = {"client": "Client", "worker": "Worker"}
+RECENT_JOBS = 50
+
+
+# ---------------- AGING ----------------
+@report_bp.route("/aging")
+@login_required
+def aging():
+    kind = request.args.get("type", "client")
+    if kind not in AGING_TYPES:
+        abort(404)
+    try:
+        as_of = datetime.strptime(request.args["as_of"], "%Y-%m-%d").date() if request.args.get("as_of") else None
+    except ValueError:
+        abort(400, "Bad as_of date, expected YYYY-MM-DD")
+
+    rows = aging_report(AGING_TYPES[kind], as_of)
+    totals = {col: sum(r[col] for r in rows) for col in (*AGING_BUCKETS, "total")}
+
+    return render_template("aging.html", kind=kind, rows=rows, totals=totals,
+                           buckets=AGING_BUCKETS, as_of=as_of or date.today())
+
+
+# ---------------- BACKGROUND REPORTS ----------------
+@report_bp.route("/jobs", methods=["GET", "POST"])
+@login_required
+@idempotent("reports.report_jobs")
+def report_jobs():
+    if request.method == "POST":
+        try:
+            job = enqueue(request.form.get("kind"), request.form)
+        except ValueError as e:
+            db.session.rollback()
+            flash(f"⚠️ Could not queue the report: {e}", "warning")
+        else:
+            if job.status == "done":
+                flash("✅ This report is already built, download it below.", "success")
+            else:
+                flash("⏳ Report queued, it will be ready for download here shortly.", "info")
+        return redirect(url_for("reports.report_jobs"))
+
+    jobs = db.session.execute(
+        db.select(report_job).order_by(report_job.created_at.desc()).limit(RECENT_JOBS)
+    ).scalars().all()
+    return render_template("report_jobs.html", jobs=jobs, kinds=REPORT_KINDS,
+                           pending=any(job.status in PENDING for job in jobs), today=date.today())
+
+
+@report_bp.route("/jobs/<job_id>/download")
+@login_required
+def download_report(job_id):
+    job = db.session.get(report_job, job_id)
+    if job is None or job.status != "done":
+        abort(404)
+    path = report_path(job)
+    if not os.path.exists(path):
+        flash("⚠️ That report file has expired, please request it again.", "warning")
+        return redirect(url_for("reports.report_jobs"))
+    return send_file(path, as_attachment=True, download_name=job.file_name)
@@ -1,6 +1,9 @@
-from flask import Blueprint, render_template, session, redirect, url_for, flash, request
+import json
+import queue
+import time
+from flask import Blueprint, render_template, session, redirect, url_for, flash, request, jsonify, Response, current_app
 from app import db
-from sqlalchemy import text, func
+from sqlalchemy import text
 from datetime import datetime, date
 from app.models import (
     raw_material,
@@ -8,8 +11,19 @@ from app.models import (
     Client_Order_Details,
     client_workers,
     Worker_work_Details,
-    Worker_Payment_Details
+    Worker_Payment_Details,
+    party_balance,
+    ledger_archives
 )
+from app.balances import open_balance, record_order, record_payment
+from app.cache import dashboard_cache
+from app.changes import conditional
+from app.events import hub, publish, publish_ledger
+from app.idempotency import idempotent
+from app.parties import party_directory, search_parties
+from app.periods import carried_forward, closed_period_error, closed_through
+from app.rollups import raw_material_spend, record_raw_material
+from app.pagination import KeysetPage, decode_cursor
 
 task_bp = Blueprint('tasks', __name__)
 
@@ -31,13 +45,72 @@ def login_required(view_func):
 @task_bp.route("/", methods=["GET", "POST"])
 @login_required
 def dashboard():
-    total_sale = db.session.query(func.coalesce(func.sum(Client_Order_Details.total_amount), 0)).scalar()
-    total_payment_recieve = db.session.query(func.coalesce(func.sum(client_payment_details.amount), 0)).scalar()
-    due_amount = total_sale - total_payment_recieve
+    data = dashboard_cache.get_or_set("dashboard", load_dashboard)
+    today = date.today().strftime("%Y-%m-%d")
+
+    return render_template(
+        "index.html",
+        summary=data["summary"],
+        recent_clients=data["recent_clients"],
+        recent_workers=data["recent_workers"],
+        recent_materials=data["recent_materials"],
+        today=today
+    )
+
 
-    total_worker_payment = db.session.query(func.coalesce(func.sum(Worker_Payment_Details.amount), 0)).scalar()
-    total_raw_material_payment = db.session.query(func.coalesce(func.sum(raw_material.amount), 0)).scalar()
-    total_expenditure = total_worker_payment + total_raw_material_payment
+@task_bp.route("/events/dashboard")
+@login_required
+def dashboard_events():
+    """Server-Sent Events stream of dashboard changes (see app.events)."""
+    stream = hub.subscribe(current_app.config["EVENT_MAX_STREAMS"])
+    if stream is None:
+        # this worker's stream slots are taken; an EventSource only reconnects
+        # after a 200, so end at once and ask it to come back later
+        return Response(f"retry: {current_app.config['EVENT_BUSY_RETRY_MS']}\n\n", mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache"})
+    hub.ensure_listener(current_app._get_current_object())
+    heartbeat = current_app.config["EVENT_HEARTBEAT"]
+    lifetime = current_app.config["EVENT_STREAM_SECONDS"]
+
+    def generate():
+        # browsers reconnect by themselves; ending streams frees gthread threads now and then
+        yield "retry: 3000\n\n"
+        ends_at = time.monotonic() + lifetime
+        while time.monotonic() < ends_at:
+            try:
+                payload = stream.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"data: {json.dumps(payload, default=str)}\n\n"
+
+    response = Response(generate(), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # frees the slot even if the client leaves before the generator starts
+    response.call_on_close(lambda: hub.unsubscribe(stream))
+    return response
+
+
+def load_dashboard():
+    """Build the dashboard payload; cached by ``dashboard_cache``."""
+
+    # ------------------- Summary (one aggregate pass) -------------------
+    totals = db.session.execute(
+        text("""
+            SELECT
+            COALESCE(SUM(CASE WHEN cw.status='Client' THEN b.total_ordered END),0) AS total_sale,
+            COALESCE(SUM(CASE WHEN cw.status='Client' THEN b.total_paid END),0) AS total_payment_recieve,
+            COALESCE(SUM(CASE WHEN cw.status='Worker' THEN b.total_paid END),0) AS total_worker_payment,
+            (SELECT COALESCE(SUM(amount),0) FROM raw_material_monthly) AS total_raw_material_payment
+            FROM party_balance b
+            JOIN client_workers cw ON cw.cw_id = b.cw_id
+        """)
+    ).mappings().one()
+
+    total_sale = totals["total_sale"]
+    total_payment_recieve = totals["total_payment_recieve"]
+    due_amount = total_sale - total_payment_recieve
+    total_expenditure = totals["total_worker_payment"] + totals["total_raw_material_payment"]
     total_profit = total_payment_recieve - total_expenditure
 
     summary = {
@@ -47,98 +120,56 @@ def dashboard():
         "total_expenditure": total_expenditure
     }
 
-    # ------------------- Recent Clients -------------------
-    recent_clients = db.session.execute(
+    # ------------------- Top dues (clients and workers together) -------------------
+    top_dues = db.session.execute(
         text("""
-            SELECT 
-            cw.client_name,
-            COALESCE(o.total_orders,0) - COALESCE(p.total_payments,0) AS due_amount
-            FROM client_workers cw
-            LEFT JOIN (
-            SELECT cw_id, SUM(total_amount) AS total_orders
-            FROM client__order__details
-            GROUP BY cw_id
-            ) o ON cw.cw_id = o.cw_id
-            LEFT JOIN (
-            SELECT cw_id, SUM(amount) AS total_payments
-            FROM client_payment_details
-            GROUP BY cw_id
-            ) p ON cw.cw_id = p.cw_id
-            WHERE cw.status='Client'
+            SELECT client_name, status, due_amount FROM (
+                SELECT
+                cw.client_name,
+                cw.status,
+                COALESCE(b.due_amount,0) AS due_amount,
+                ROW_NUMBER() OVER (
+                    PARTITION BY cw.status ORDER BY COALESCE(b.due_amount,0) DESC
+                ) AS rank_in_status
+                FROM client_workers cw
+                LEFT JOIN party_balance b ON cw.cw_id = b.cw_id
+            ) ranked
+            WHERE rank_in_status <= 2
             ORDER BY due_amount DESC
-            LIMIT 2
         """)
     ).mappings().all()
 
     clients_list = [
         {"name": c["client_name"], "due_amount": c["due_amount"]}
-        for c in recent_clients
+        for c in top_dues if c["status"] == "Client"
     ]
-
-    # ------------------- Recent Workers -------------------
-    recent_workers = db.session.execute(
-        text("""
-            SELECT 
-            cw.client_name,
-            COALESCE(o.total_orders,0) - COALESCE(p.total_payments,0) AS remaining_amount
-            FROM client_workers cw
-            LEFT JOIN (
-            SELECT cw_id, SUM(total_amount) AS total_orders
-            FROM worker_work__details
-            GROUP BY cw_id
-            ) o ON cw.cw_id = o.cw_id
-            LEFT JOIN (
-            SELECT cw_id, SUM(amount) AS total_payments
-            FROM worker__payment__details
-            GROUP BY cw_id
-            ) p ON cw.cw_id = p.cw_id
-            WHERE cw.status='Worker'
-            ORDER BY remaining_amount DESC
-            LIMIT 2
-        """)
-    ).mappings().all()
-
     worker_list = [
-        {"name": c["client_name"], "due_amount": c["remaining_amount"]}
-        for c in recent_workers
+        {"name": c["client_name"], "due_amount": c["due_amount"]}
+        for c in top_dues if c["status"] == "Worker"
     ]
 
     # ------------------- Recent Materials -------------------
     recent_materials = db.session.execute(
-        text("""
-            SELECT item, date, quantity, price, quantity * price AS amount 
-            FROM raw_material 
-            ORDER BY date DESC 
-            LIMIT 3
-        """)
-    ).mappings().all()
+        db.select(raw_material).order_by(raw_material.date.desc()).limit(3)
+    ).scalars().all()
 
     material_list = [
         {
-            "name": m["item"],
-            # "date": datetime.strptime(m["date"], "%Y-%m-%d") if m["date"] else None,
-            "date": m["date"] if m["date"] else None,
-            "quantity": m["quantity"],
-            "price": m["price"],
-            "amount": m["amount"],
+            "name": m.item,
+            "date": m.date,
+            "quantity": m.quantity,
+            "price": m.price,
+            "amount": m.amount,
         }
         for m in recent_materials
     ]
 
-    clients = db.session.execute(text("SELECT client_name FROM client_workers WHERE status='Client'")).mappings().all()
-    workers = db.session.execute(text("SELECT client_name FROM client_workers WHERE status='Worker'")).mappings().all()
-    today = date.today().strftime("%Y-%m-%d")
-
-    return render_template(
-        "index.html",
-        summary=summary,
-        recent_clients=clients_list,
-        recent_workers=worker_list,
-        recent_materials=material_list,
-        clients=clients,
-        workers=workers,
-        today=today
-    )
+    return {
+        "summary": summary,
+        "recent_clients": clients_list,
+        "recent_workers": worker_list,
+        "recent_materials": material_list,
+    }
 
 # =====================================================================
 # =========================== OTHER ROUTES ============================
@@ -158,12 +189,9 @@ def raw_materials():
     materials_pagination = query.order_by(raw_material.date.desc()).paginate(page=page, per_page=10)
     materials = materials_pagination.items
 
-    total_inventory_value = db.session.query(db.func.sum(raw_material.amount)).scalar() or 0
+    total_inventory_value = raw_material_spend()
     now = datetime.now()
-    monthly_purchase = db.session.query(db.func.sum(raw_material.amount)).filter(
-        db.extract("year", raw_material.date) == now.year,
-        db.extract("month", raw_material.date) == now.month
-    ).scalar() or 0
+    monthly_purchase = raw_material_spend(now, now)
 
     today = datetime.today().strftime("%Y-%m-%d")
 
@@ -187,6 +215,7 @@ def clear_filters():
 # ---------------- ADD FORMS ----------------
 @task_bp.route('/add_raw_material', methods=['POST'])
 @login_required
+@idempotent("tasks.raw_materials")
 def add_raw_material():
     name = request.form.get('name')
     date_str = request.form.get('date')
@@ -199,9 +228,18 @@ def add_raw_material():
 
     try:
         date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
+        closed = closed_period_error(date_obj)
+        if closed:
+            flash(f"❌ {closed}!", "danger")
+            return redirect(url_for('tasks.raw_materials'))
         new_material = raw_material(item=name, date=date_obj, quantity=quantity, price=price)
         db.session.add(new_material)
+        db.session.flush()
+        record_raw_material(name, date_obj, quantity, new_material.amount)
+        publish({"type": "raw_material", "item": name, "date": date_obj.isoformat(),
+                 "quantity": quantity, "price": price, "amount": new_material.amount})
         db.session.commit()
+        dashboard_cache.clear()
         flash(f"Raw Material '{name}' added successfully!", "success")
     except Exception as e:
         db.session.rollback()
@@ -210,183 +248,336 @@ def add_raw_material():
     return redirect(url_for('tasks.raw_materials'))
 
 
+# ---------------- STATEMENTS ----------------
+STATEMENT_PAGE_SIZE = 50
+
+# (model, primary key, columns sent to the browser) per statement section
+STATEMENT_SECTIONS = {
+    "Client": {
+        "items": (Client_Order_Details, Client_Order_Details.co_id,
+                  ("item", "description", "date", "quantity", "price", "total_amount")),
+        "payments": (client_payment_details, client_payment_details.cp_id,
+                     ("date", "mode", "description", "amount")),
+    },
+    "Worker": {
+        "items": (Worker_work_Details, Worker_work_Details.ww_id,
+                  ("item", "description", "date", "quantity", "price", "total_amount")),
+        "payments": (Worker_Payment_Details, Worker_Payment_Details.wp_id,
+                     ("date", "mode", "description", "amount")),
+    },
+}
+
+
+def find_party(name):
+    return db.session.execute(
+        db.select(client_workers.cw_id, client_workers.client_name, party_balance.total_ordered, party_balance.due_amount)
+        .outerjoin(party_balance, party_balance.cw_id == client_workers.cw_id)
+        .where(client_workers.client_name == name)
+    ).mappings().first()
+
+
+def statement_page(status, section, cw_id, after=None, per_page=STATEMENT_PAGE_SIZE, archived=False):
+    """Newest-first page of one statement section, keyed on (date, id).
+
+    ``archived`` reads the entries moved out by closed periods instead.
+    """
+    model, pk, _ = STATEMENT_SECTIONS[status][section]
+    source = ledger_archives[model] if archived else model.__table__
+    pk = source.c[pk.key]
+    query = db.select(source).where(source.c.cw_id == cw_id)
+
+    cursor = decode_cursor(after, (str, int))
+    if cursor:
+        try:
+            last_date, last_id = date.fromisoformat(cursor[0]), int(cursor[1])
+        except (TypeError, ValueError):
+            cursor = None
+        else:
+            query = query.where(db.or_(
+                source.c.date < last_date,
+                db.and_(source.c.date == last_date, pk < last_id),
+            ))
+    else:
+        cursor = None
+
+    rows = db.session.execute(
+        query.order_by(source.c.date.desc(), pk.desc()).limit(per_page + 1)
+    ).all()
+
+    return KeysetPage.from_rows(
+        rows,
+        per_page,
+        backwards=False,
+        had_cursor=cursor is not None,
+        key=lambda r: (r.date.isoformat(), getattr(r, pk.key)),
+    )
+
+
+# a statement changes whenever its party's balance does
+STATEMENT_COUNTERS = ("client_workers", "party_balance")
+
+
+def statement_json(status, name):
+    section = request.args.get("section", "items")
+    if section not in ("items", "payments"):
+        return jsonify({"error": "unknown section"}), 400
+
+    party = find_party(name)
+    if not party:
+        return jsonify({"error": f"{status} not found"}), 404
+
+    page = statement_page(status, section, party["cw_id"], after=request.args.get("after"),
+                          archived=request.args.get("archived") == "1")
+    _, _, columns = STATEMENT_SECTIONS[status][section]
+    rows = []
+    for r in page.items:
+        row = {col: getattr(r, col) for col in columns}
+        row["date"] = r.date.strftime("%d/%m/%Y")
+        rows.append(row)
+
+    return jsonify({"rows": rows, "next": page.next_cursor})
+
+
 # ---------------- SHOW CLIENT ----------------
 @task_bp.route("/client/<name>")
 @login_required
 def show_client(name):
-    from datetime import datetime
-    client_row = db.session.execute(
-        text("SELECT cw_id, client_name FROM client_workers WHERE client_name = :name"),
-        {"name": name}
-    ).mappings().first()
+    client_row = find_party(name)
 
     if not client_row:
         return "Client not found", 404
 
-    orders = db.session.execute(
-        text("""
-            SELECT co_id, item, date, description, quantity, price, total_amount
-            FROM client__order__details
-            WHERE cw_id = :cid order by date DESC
-        """),
-        {"cid": client_row["cw_id"]}
-    ).mappings().all()
-
-    payments = db.session.execute(
-        text("""
-            SELECT cp_id, date, mode, description, amount
-            FROM client_payment_details
-            WHERE cw_id = :cid order by date DESC
-        """),
-        {"cid": client_row["cw_id"]}
-    ).mappings().all()
-
-    orders = [dict(o) for o in orders]
-    payments = [dict(p) for p in payments]
-
-    for o in orders:
-        if o["date"]:
-            o["date"] = datetime.strptime(str(o["date"]), "%Y-%m-%d").strftime("%d/%m/%Y")
-    for p in payments:
-        if p["date"]:
-            p["date"] = datetime.strptime(str(p["date"]), "%Y-%m-%d").strftime("%d/%m/%Y")
+    archived = request.args.get("archived") == "1"
+    orders = statement_page("Client", "items", client_row["cw_id"], archived=archived)
+    payments = statement_page("Client", "payments", client_row["cw_id"], archived=archived)
+    carried_ordered, carried_paid = carried_forward(client_row["cw_id"])
+
+    total_amount = client_row["total_ordered"] or 0
+    due_amount = client_row["due_amount"] or 0
+
+    client_data = {
+        "id": client_row["cw_id"],
+        "name": client_row["client_name"],
+        "items": orders.items,
+        "payments": payments.items,
+        "items_next": orders.next_cursor,
+        "payments_next": payments.next_cursor,
+        "archived": archived,
+        "closed_through": closed_through(),
+        "carried_ordered": carried_ordered,
+        "carried_paid": carried_paid,
+    }
 
-    total_amount = sum(o["total_amount"] for o in orders)
-    paid_amount = sum(p["amount"] for p in payments)
-    due_amount = total_amount - paid_amount
+    return render_template("clients_info.html", client=client_data, total_amount=total_amount, due_amount=due_amount)
 
-    client_data = {"id": client_row["cw_id"], "name": client_row["client_name"], "items": orders, "payments": payments}
 
-    return render_template("clients_info.html", client=client_data, total_amount=total_amount, due_amount=due_amount)
+@task_bp.route("/client/<name>/statement.json")
+@login_required
+def client_statement(name):
+    return conditional("client_statement", STATEMENT_COUNTERS, lambda: statement_json("Client", name),
+                       name, request.args.get("section"), request.args.get("after"),
+                       request.args.get("archived"))
 
 
 # ---------------- SHOW WORKER ----------------
 @task_bp.route("/worker/<name>")
 @login_required
 def show_worker(name):
-    from datetime import datetime
-    worker_row = db.session.execute(
-        text("SELECT cw_id, client_name FROM client_workers WHERE client_name = :name"),
-        {"name": name}
-    ).mappings().first()
+    worker_row = find_party(name)
 
     if not worker_row:
         return "Worker not found", 404
 
-    works = db.session.execute(
-        text("""
-            SELECT ww_id, item, date, description, quantity, price, total_amount
-            FROM worker_work__details
-            WHERE cw_id = :cid order by date DESC
-        """),
-        {"cid": worker_row["cw_id"]}
-    ).mappings().all()
+    archived = request.args.get("archived") == "1"
+    works = statement_page("Worker", "items", worker_row["cw_id"], archived=archived)
+    payments = statement_page("Worker", "payments", worker_row["cw_id"], archived=archived)
+    carried_ordered, carried_paid = carried_forward(worker_row["cw_id"])
+
+    total_amount = worker_row["total_ordered"] or 0
+    remaining_amount = worker_row["due_amount"] or 0
+
+    worker_data = {
+        "id": worker_row["cw_id"],
+        "name": worker_row["client_name"],
+        "items": works.items,
+        "payments": payments.items,
+        "items_next": works.next_cursor,
+        "payments_next": payments.next_cursor,
+        "archived": archived,
+        "closed_through": closed_through(),
+        "carried_ordered": carried_ordered,
+        "carried_paid": carried_paid,
+    }
+
+    return render_template("workers_info.html", worker=worker_data, total_amount=total_amount, remaining_amount=remaining_amount)
 
-    payments = db.session.execute(
-        text("""
-            SELECT wp_id, date, mode, description, amount
-            FROM worker__payment__details
-            WHERE cw_id = :cid order by date DESC
-        """),
-        {"cid": worker_row["cw_id"]}
-    ).mappings().all()
 
-    works = [dict(o) for o in works]
-    payments = [dict(p) for p in payments]
+@task_bp.route("/worker/<name>/statement.json")
+@login_required
+def worker_statement(name):
+    return conditional("worker_statement", STATEMENT_COUNTERS, lambda: statement_json("Worker", name),
+                       name, request.args.get("section"), request.args.get("after"),
+                       request.args.get("archived"))
 
-    for o in works:
-        if o["date"]:
-            o["date"] = datetime.strptime(str(o["date"]), "%Y-%m-%d").strftime("%d/%m/%Y")
-    for p in payments:
-        if p["date"]:
-            p["date"] = datetime.strptime(str(p["date"]), "%Y-%m-%d").strftime("%d/%m/%Y")
 
-    total_amount = sum(o["total_amount"] for o in works)
-    paid_amount = sum(p["amount"] for p in payments)
-    remaining_amount = total_amount - paid_amount
+# ---------------- PARTY SEARCH ----------------
+PARTY_SEARCH_LIMIT = 10
+PARTY_SEARCH_STATUSES = {"client": "Client", "worker": "Worker"}
 
-    worker_data = {"id": worker_row["cw_id"], "name": worker_row["client_name"], "items": works, "payments": payments}
 
-    return render_template("workers_info.html", worker=worker_data, total_amount=total_amount, remaining_amount=remaining_amount)
+@task_bp.route("/parties/search.json")
+@login_required
+def party_search():
+    """Typeahead suggestions for the dashboard party pickers."""
+    status = PARTY_SEARCH_STATUSES.get(request.args.get("type", "").lower())
+    if status is None:
+        return jsonify({"error": "type must be client or worker"}), 400
+    term = request.args.get("q", "")[:100]
+    limit = min(request.args.get("limit", PARTY_SEARCH_LIMIT, type=int), 50)
+    return jsonify({"results": search_parties(term, status, max(limit, 1))})
+
+
+# ---------------- CART LINES ----------------
+def cart_lines(form, item_key, description_key, quantity_key, price_key):
+    """Read the repeated line-item fields of a cart form.
+
+    Lines with no item, quantity or price are skipped; a partly filled or
+    non-numeric line raises ValueError.
+    """
+    items = form.getlist(item_key)
+    descriptions = form.getlist(description_key)
+    quantities = form.getlist(quantity_key)
+    prices = form.getlist(price_key)
+
+    lines = []
+    for i, item in enumerate(items):
+        description = descriptions[i] if i < len(descriptions) else ""
+        quantity = quantities[i] if i < len(quantities) else ""
+        price = prices[i] if i < len(prices) else ""
+        if not (item.strip() or quantity.strip() or price.strip()):
+            continue
+        if not item.strip() or not quantity.strip() or not price.strip():
+            raise ValueError(f"line {i + 1} is incomplete")
+        lines.append({
+            "item": item.strip(),
+            "description": description,
+            "quantity": float(quantity),
+            "price": float(price),
+        })
+    return lines
 
 
 # ---------------- ADD CLIENT ORDER ----------------
 @task_bp.route("/add_client_order", methods=["POST"])
 @login_required
+@idempotent("tasks.dashboard")
 def add_client_order():
     client_name = request.form.get("client_name")
-    item_name = request.form.get("item_name")
-    description = request.form.get("description")
     order_date = request.form.get("date")
-    quantity = float(request.form.get("quantity"))
-    price = float(request.form.get("price"))
 
-    cw = db.session.execute(
-        text("SELECT cw_id FROM client_workers WHERE client_name = :name"), {"name": client_name}
-    ).mappings().first()
+    try:
+        lines = cart_lines(request.form, "item_name", "description", "quantity", "price")
+        order_date = datetime.strptime(order_date, "%Y-%m-%d")
+    except (TypeError, ValueError) as e:
+        flash(f"⚠️ Could not read the order: {e}", "warning")
+        return redirect(url_for("tasks.dashboard"))
 
-    if not cw:
-        flash("❌ Selected client not found!", "danger")
+    closed = closed_period_error(order_date)
+    if closed:
+        flash(f"❌ {closed}!", "danger")
+        return redirect(url_for("tasks.dashboard"))
+
+    if not lines:
+        flash("⚠️ Please add at least one item!", "warning")
         return redirect(url_for("tasks.dashboard"))
 
-    cw_id = cw["cw_id"]
+    cw_id = party_directory.lookup(client_name, "Client")
 
-    new_order = Client_Order_Details(
-        item=item_name,
-        date=datetime.strptime(order_date, "%Y-%m-%d"),
-        description=description,
-        quantity=quantity,
-        price=price,
-        cw_id=cw_id
-    )
+    if not cw_id:
+        flash("❌ Selected client not found!", "danger")
+        return redirect(url_for("tasks.dashboard"))
+
+    new_orders = [
+        Client_Order_Details(
+            item=line["item"],
+            date=order_date,
+            description=line["description"],
+            quantity=line["quantity"],
+            price=line["price"],
+            cw_id=cw_id
+        )
+        for line in lines
+    ]
 
-    db.session.add(new_order)
+    db.session.add_all(new_orders)
+    db.session.flush()
+    order_total = sum(o.total_amount or 0 for o in new_orders)
+    record_order(cw_id, order_total, order_date)
+    publish_ledger("Client", "ordered", client_name, cw_id, order_total)
     db.session.commit()
-    flash("✅ Client order added successfully!", "success")
+    dashboard_cache.clear()
+    flash(f"✅ Client order added successfully! ({len(new_orders)} items)", "success")
     return redirect(url_for("tasks.dashboard"))
 
 
 # ---------------- ADD WORKER WORK ----------------
 @task_bp.route("/add_worker_work", methods=["POST"])
 @login_required
+@idempotent("tasks.dashboard")
 def add_worker_work():
     worker_name = request.form.get("worker_name_1")
-    item = request.form.get("item_name_1")
-    description = request.form.get("description_1")
     work_date = request.form.get("date_1")
-    quantity = float(request.form.get("quantity_1"))
-    price = float(request.form.get("price_1"))
 
-    cw = db.session.execute(
-        text("SELECT cw_id FROM client_workers WHERE client_name = :name AND status='Worker'"),
-        {"name": worker_name}
-    ).mappings().first()
+    try:
+        lines = cart_lines(request.form, "item_name_1", "description_1", "quantity_1", "price_1")
+        work_date = datetime.strptime(work_date, "%Y-%m-%d")
+    except (TypeError, ValueError) as e:
+        flash(f"⚠️ Could not read the work entry: {e}", "warning")
+        return redirect(url_for("tasks.dashboard"))
 
-    if not cw:
-        flash("❌ Selected worker not found!", "danger")
+    closed = closed_period_error(work_date)
+    if closed:
+        flash(f"❌ {closed}!", "danger")
         return redirect(url_for("tasks.dashboard"))
 
-    cw_id = cw["cw_id"]
+    if not lines:
+        flash("⚠️ Please add at least one item!", "warning")
+        return redirect(url_for("tasks.dashboard"))
 
-    new_work = Worker_work_Details(
-        cw_id=cw_id,
-        item=item,
-        description=description,
-        date=datetime.strptime(work_date, "%Y-%m-%d"),
-        quantity=quantity,
-        price=price
-    )
+    cw_id = party_directory.lookup(worker_name, "Worker")
 
-    db.session.add(new_work)
+    if not cw_id:
+        flash("❌ Selected worker not found!", "danger")
+        return redirect(url_for("tasks.dashboard"))
+
+    new_works = [
+        Worker_work_Details(
+            cw_id=cw_id,
+            item=line["item"],
+            description=line["description"],
+            date=work_date,
+            quantity=line["quantity"],
+            price=line["price"]
+        )
+        for line in lines
+    ]
+
+    db.session.add_all(new_works)
+    db.session.flush()
+    work_total = sum(w.total_amount or 0 for w in new_works)
+    record_order(cw_id, work_total, work_date)
+    publish_ledger("Worker", "ordered", worker_name, cw_id, work_total)
     db.session.commit()
+    dashboard_cache.clear()
 
-    flash("✅ Worker work added successfully!", "success")
+    flash(f"✅ Worker work added successfully! ({len(new_works)} items)", "success")
     return redirect(url_for("tasks.dashboard"))
 
 
 # ---------------- ADD CLIENT PAYMENT ----------------
 @task_bp.route("/add_client_payment", methods=["POST"])
 @login_required
+@idempotent("tasks.dashboard")
 def add_client_payment():
     try:
         client_name = request.form.get("client_name_0")
@@ -400,14 +591,19 @@ def add_client_payment():
             return redirect(url_for("tasks.dashboard"))
 
         amount = int(amount)
-        cw = client_workers.query.filter_by(client_name=client_name, status="Client").first()
+        closed = closed_period_error(datetime.strptime(payment_date, "%Y-%m-%d"))
+        if closed:
+            flash(f"❌ {closed}!", "danger")
+            return redirect(url_for("tasks.dashboard"))
 
-        if not cw:
+        cw_id = party_directory.lookup(client_name, "Client")
+
+        if not cw_id:
             flash("❌ Selected client not found!", "danger")
             return redirect(url_for("tasks.dashboard"))
 
         new_payment = client_payment_details(
-            cw_id=cw.cw_id,
+            cw_id=cw_id,
             date=datetime.strptime(payment_date, "%Y-%m-%d"),
             mode=payment_mode,
             description=description,
@@ -415,7 +611,10 @@ def add_client_payment():
         )
 
         db.session.add(new_payment)
+        record_payment(cw_id, amount, new_payment.date)
+        publish_ledger("Client", "paid", client_name, cw_id, amount)
         db.session.commit()
+        dashboard_cache.clear()
 
         flash("✅ Client payment added successfully!", "success")
         return redirect(url_for("tasks.dashboard"))
@@ -429,6 +628,7 @@ def add_client_payment():
 # ---------------- ADD WORKER PAYMENT ----------------
 @task_bp.route("/add_worker_payment", methods=["POST"])
 @login_required
+@idempotent("tasks.dashboard")
 def add_worker_payment():
     worker_name = request.form.get("worker_name_2")
     payment_date = request.form.get("date_2")
@@ -436,17 +636,17 @@ def add_worker_payment():
     description = request.form.get("description_2")
     amount = float(request.form.get("amount_2"))
 
-    cw = db.session.execute(
-        text("SELECT cw_id FROM client_workers WHERE client_name = :name AND status='Worker'"),
-        {"name": worker_name}
-    ).mappings().first()
+    closed = closed_period_error(datetime.strptime(payment_date, "%Y-%m-%d"))
+    if closed:
+        flash(f"❌ {closed}!", "danger")
+        return redirect(url_for("tasks.dashboard"))
+
+    cw_id = party_directory.lookup(worker_name, "Worker")
 
-    if not cw:
+    if not cw_id:
         flash("❌ Selected worker not found!", "danger")
         return redirect(url_for("tasks.dashboard"))
 
-    cw_id = cw["cw_id"]
-
     new_payment = Worker_Payment_Details(
         cw_id=cw_id,
         date=datetime.strptime(payment_date, "%Y-%m-%d"),
@@ -456,58 +656,104 @@ def add_worker_payment():
     )
 
     db.session.add(new_payment)
+    db.session.flush()
+    record_payment(cw_id, new_payment.amount, new_payment.date)
+    publish_ledger("Worker", "paid", worker_name, cw_id, new_payment.amount)
     db.session.commit()
+    dashboard_cache.clear()
 
     flash("✅ Worker payment added successfully!", "success")
     return redirect(url_for("tasks.dashboard"))
 
 
 
+# ---------------- CLIENT / WORKER LISTING ----------------
+PARTIES_PER_PAGE = 8
+
+PARTY_LIST_SQL = """
+    WITH listing AS (
+        SELECT
+        cw.cw_id,
+        cw.client_name,
+        COALESCE(b.due_amount,0) AS due_amount,
+        COUNT(*) OVER () AS total
+        FROM client_workers cw
+        LEFT JOIN party_balance b ON cw.cw_id = b.cw_id
+        WHERE cw.status = :status AND cw.client_name {like} :pattern
+    )
+    SELECT cw_id, client_name, due_amount, total
+    FROM listing
+    {keyset}
+    ORDER BY due_amount {desc}, client_name {asc}, cw_id {asc}
+    LIMIT :limit
+"""
+
+AFTER_KEYSET = """WHERE due_amount < :due
+    OR (due_amount = :due AND (client_name > :name OR (client_name = :name AND cw_id > :cw_id)))"""
+BEFORE_KEYSET = """WHERE due_amount > :due
+    OR (due_amount = :due AND (client_name < :name OR (client_name = :name AND cw_id < :cw_id)))"""
+
+# (due_amount, client_name, cw_id)
+PARTY_CURSOR_TYPES = (float, str, int)
+
+
+def party_page(status, search, after=None, before=None, per_page=PARTIES_PER_PAGE):
+    """One page of clients/workers ordered by due amount, filtered in SQL.
+
+    The total matching count comes back on every row from the same query.
+    """
+    before_key = decode_cursor(before, PARTY_CURSOR_TYPES)
+    cursor = before_key or decode_cursor(after, PARTY_CURSOR_TYPES)
+    backwards = before_key is not None
+    params = {
+        "status": status,
+        "pattern": f"%{search}%",
+        "limit": per_page + 1,
+    }
+
+    keyset = ""
+    if cursor:
+        params.update(due=cursor[0], name=cursor[1], cw_id=cursor[2])
+        keyset = BEFORE_KEYSET if backwards else AFTER_KEYSET
+    else:
+        cursor = None
+        backwards = False
+
+    # ILIKE can use the pg_trgm index on PostgreSQL; SQLite's LIKE already ignores case
+    sql = PARTY_LIST_SQL.format(
+        like="ILIKE" if db.engine.dialect.name == "postgresql" else "LIKE",
+        keyset=keyset,
+        desc="ASC" if backwards else "DESC",
+        asc="DESC" if backwards else "ASC",
+    )
+    rows = db.session.execute(text(sql), params).mappings().all()
+
+    return KeysetPage.from_rows(
+        rows,
+        per_page,
+        backwards=backwards,
+        had_cursor=cursor is not None,
+        key=lambda r: (r["due_amount"], r["client_name"], r["cw_id"]),
+        total=rows[0]["total"] if rows else 0,
+    )
+
+
 # ---------------- ALL CLIENTS PAGE ----------------
 @task_bp.route("/all_clients")
 @login_required
 def all_clients():
-
-    page = request.args.get("page", 1, type=int)
     search = request.args.get("search", "").strip()
 
-    query = client_workers.query.filter_by(status="Client")
-    if search:
-        query = query.filter(client_workers.client_name.ilike(f"%{search}%"))
-    
-    recent_clients = db.session.execute(
-        text("""
-            SELECT 
-            cw.client_name,
-            COALESCE(o.total_orders,0) - COALESCE(p.total_payments,0) AS due_amount
-            FROM client_workers cw
-            LEFT JOIN (
-            SELECT cw_id, SUM(total_amount) AS total_orders
-            FROM client__order__details
-            GROUP BY cw_id
-            ) o ON cw.cw_id = o.cw_id
-            LEFT JOIN (
-            SELECT cw_id, SUM(amount) AS total_payments
-            FROM client_payment_details
-            GROUP BY cw_id
-            ) p ON cw.cw_id = p.cw_id
-            WHERE cw.status='Client' order by due_amount desc
-            
-        """)
-    ).mappings().all()
-
-    # Pagination
-    clients_pagination = query.order_by(client_workers.client_name.asc()).paginate(page=page, per_page=8)
-    clients_list = [{"name": c.client_name, "due_amount": c.due_amount} for c in recent_clients]  # placeholder due
-
-    total_clients = query.count()
-    
+    clients_pagination = party_page(
+        "Client", search, after=request.args.get("after"), before=request.args.get("before")
+    )
+    clients_list = [{"name": c["client_name"], "due_amount": c["due_amount"]} for c in clients_pagination.items]
 
     return render_template(
         "all_client_details.html",
         clients=clients_list,
         clients_pagination=clients_pagination,
-        total_clients=total_clients,
+        total_clients=clients_pagination.total,
         search=search
     )
 
@@ -515,6 +761,7 @@ def all_clients():
 # ---------------- ADD NEW CLIENT ----------------
 @task_bp.route("/add_client", methods=["POST"])
 @login_required
+@idempotent("tasks.all_clients")
 def add_client():
     name = request.form.get("name")
     contact = request.form.get("contact")  # optional
@@ -526,7 +773,11 @@ def add_client():
     try:
         new_client = client_workers(client_name=name, status="Client")
         db.session.add(new_client)
+        db.session.flush()
+        open_balance(new_client.cw_id)
         db.session.commit()
+        dashboard_cache.clear()
+        party_directory.invalidate()
         flash(f"Client '{name}' added successfully!", "success")
     except Exception as e:
         db.session.rollback()
@@ -540,46 +791,18 @@ def add_client():
 @task_bp.route("/all_workers")
 @login_required
 def all_workers():
-
-    page = request.args.get("page", 1, type=int)
     search = request.args.get("search", "").strip()
 
-    query = client_workers.query.filter_by(status="Worker")
-    if search:
-        query = query.filter(client_workers.client_name.ilike(f"%{search}%"))
-    
-    recent_workers = db.session.execute(
-        text("""
-            SELECT 
-            cw.client_name,
-            COALESCE(o.total_orders,0) - COALESCE(p.total_payments,0) AS remaining_amount
-            FROM client_workers cw
-            LEFT JOIN (
-            SELECT cw_id, SUM(total_amount) AS total_orders
-            FROM worker_work__details
-            GROUP BY cw_id
-            ) o ON cw.cw_id = o.cw_id
-            LEFT JOIN (
-            SELECT cw_id, SUM(amount) AS total_payments
-            FROM worker__payment__details
-            GROUP BY cw_id
-            ) p ON cw.cw_id = p.cw_id
-            WHERE cw.status='Worker'
-        """)
-    ).mappings().all()
-
-    # Pagination
-    workers_pagination = query.order_by(client_workers.client_name.asc()).paginate(page=page, per_page=8)
-    workers_list = [{"name": w.client_name, "due_amount": w.remaining_amount} for w in recent_workers]  # placeholder due
-
-    total_workers = query.count()
-    
+    workers_pagination = party_page(
+        "Worker", search, after=request.args.get("after"), before=request.args.get("before")
+    )
+    workers_list = [{"name": w["client_name"], "due_amount": w["due_amount"]} for w in workers_pagination.items]
 
     return render_template(
         "all_worker_details.html",
         workers=workers_list,
         workers_pagination=workers_pagination,
-        total_workers=total_workers,
+        total_workers=workers_pagination.total,
         search=search
     )
 
@@ -587,6 +810,7 @@ def all_workers():
 # ---------------- ADD NEW CLIENT ----------------
 @task_bp.route("/add_worker", methods=["POST"])
 @login_required
+@idempotent("tasks.all_workers")
 def add_worker():
     name = request.form.get("name")
     contact = request.form.get("contact")  # optional
@@ -598,7 +822,11 @@ def add_worker():
     try:
         new_worker = client_workers(client_name=name, status="Worker")
         db.session.add(new_worker)
+        db.session.flush()
+        open_balance(new_worker.cw_id)
         db.session.commit()
+        dashboard_cache.clear()
+        party_directory.invalidate()
         flash(f"Worker '{name}' added successfully!", "success")
     except Exception as e:
         db.session.rollback()
@@ -49,3 +49,55 @@ closeBtn_2.addEventListener("click", () => {
     cartForm_2.style.display = "none";   // Hide cart
 });
 
+
+
+// Multi-item order forms: "Add Another Item" moves the typed item into the
+// cart below and clears the inputs; every cart line is posted together.
+document.querySelectorAll("form.cart-order").forEach((form) => {
+    const fields = form.dataset.fields.split(",");
+    const lines = form.querySelector(".cart-lines tbody");
+    const addBtn = form.querySelector(".add-line-btn");
+    const input = (name) => form.querySelector(`[name="${name}"]:not([type="hidden"])`);
+
+    // the typed item is optional once the cart has lines
+    const refreshRequired = () => {
+        const hasLines = lines.children.length > 0;
+        fields.forEach((name) => {
+            if (input(name).dataset.required === undefined) {
+                input(name).dataset.required = input(name).required ? "1" : "";
+            }
+            input(name).required = !hasLines && input(name).dataset.required === "1";
+        });
+    };
+
+    addBtn.addEventListener("click", () => {
+        const valid = fields.every((name) => input(name).reportValidity());
+        if (!valid || !input(fields[0]).value.trim()) return;
+
+        const tr = document.createElement("tr");
+        fields.forEach((name) => {
+            const td = document.createElement("td");
+            td.textContent = input(name).value;
+            const hidden = document.createElement("input");
+            hidden.type = "hidden";
+            hidden.name = name;
+            hidden.value = input(name).value;
+            td.appendChild(hidden);
+            tr.appendChild(td);
+            input(name).value = "";
+        });
+
+        const remove = document.createElement("td");
+        remove.textContent = "✖";
+        remove.className = "remove-line";
+        remove.addEventListener("click", () => {
+            tr.remove();
+            refreshRequired();
+        });
+        tr.appendChild(remove);
+
+        lines.appendChild(tr);
+        refreshRequired();
+        input(fields[0]).focus();
+    });
+});
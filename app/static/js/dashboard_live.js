@@ -0,0 +1,121 @@
+// Keeps the open dashboard current from the server's event stream (app/events.py).
+const liveScript = document.currentScript;
+const liveEventsUrl = liveScript.dataset.eventsUrl;
+const liveApiUrl = liveScript.dataset.apiUrl;
+const livePartyUrls = { Client: liveScript.dataset.clientUrl, Worker: liveScript.dataset.workerUrl };
+
+const MATERIALS_SHOWN = 3;
+
+const rupees = (value) =>
+    "₹" + Number(value || 0).toLocaleString("en-US", { minimumFractionDigits: 2, maximumFractionDigits: 2 });
+
+const dayMonthYear = (iso) => {
+    const [y, m, d] = iso.split("-");
+    return `${d}/${m}/${y}`;
+};
+
+const setSummary = (key, value) => {
+    const el = document.querySelector(`[data-summary="${key}"]`);
+    if (!el) return;
+    el.dataset.value = value;
+    el.textContent = rupees(value);
+};
+
+const addSummary = (key, delta) => {
+    const el = document.querySelector(`[data-summary="${key}"]`);
+    if (el) setSummary(key, Number(el.dataset.value || 0) + Number(delta || 0));
+};
+
+const partyItem = (status, name, due) => {
+    const li = document.createElement("li");
+    li.dataset.party = name;
+    const link = document.createElement("a");
+    link.style.cssText = "text-decoration: none; font-size: 15px;";
+    link.href = livePartyUrls[status].replace("__name__", encodeURIComponent(name));
+    const strong = document.createElement("strong");
+    strong.textContent = name;
+    link.appendChild(strong);
+    const small = document.createElement("small");
+    small.style.cssText = "float: right; color: #666;";
+    small.dataset.due = "";
+    small.textContent = `${status === "Client" ? "Due" : "Remaining"}: ${rupees(due)}`;
+    li.append(link, small);
+    return li;
+};
+
+const materialRow = (m) => {
+    const tr = document.createElement("tr");
+    tr.dataset.date = m.date;
+    [m.item || m.name, dayMonthYear(m.date), m.quantity, rupees(m.price), rupees(m.amount)].forEach((text) => {
+        const td = document.createElement("td");
+        td.textContent = text;
+        tr.appendChild(td);
+    });
+    return tr;
+};
+
+const applyLedger = (e) => {
+    // mirrors the summary formulas in load_dashboard()
+    if (e.status === "Client" && e.side === "ordered") {
+        addSummary("total_sale", e.amount);
+        addSummary("due_amount", e.amount);
+    } else if (e.status === "Client" && e.side === "paid") {
+        addSummary("due_amount", -e.amount);
+        addSummary("total_profit", e.amount);
+    } else if (e.status === "Worker" && e.side === "paid") {
+        addSummary("total_expenditure", e.amount);
+        addSummary("total_profit", -e.amount);
+    }
+
+    const list = document.getElementById(e.status === "Client" ? "recent-clients" : "recent-workers");
+    const item = list && [...list.querySelectorAll("li[data-party]")].find((li) => li.dataset.party === e.name);
+    if (item) {
+        const small = item.querySelector("[data-due]");
+        const label = e.status === "Client" ? "Due" : "Remaining";
+        small.textContent = `${label}: ${rupees(e.due_amount)}`;
+    }
+};
+
+const applyRawMaterial = (m) => {
+    addSummary("total_expenditure", m.amount);
+    addSummary("total_profit", -m.amount);
+
+    const tbody = document.getElementById("recent-materials");
+    const rows = [...tbody.querySelectorAll("tr[data-date]")];
+    const older = rows.find((tr) => tr.dataset.date < m.date);
+    if (!older && rows.length >= MATERIALS_SHOWN) return;   // older than everything shown
+    if (!rows.length) tbody.replaceChildren();               // drop the "No materials" row
+    tbody.insertBefore(materialRow(m), older || null);
+    [...tbody.querySelectorAll("tr[data-date]")].slice(MATERIALS_SHOWN).forEach((tr) => tr.remove());
+};
+
+const resync = async () => {
+    const response = await fetch(liveApiUrl, { headers: { Accept: "application/json" } });
+    if (!response.ok) return;
+    const data = await response.json();
+    Object.entries(data.summary).forEach(([key, value]) => setSummary(key, value));
+    document.getElementById("recent-clients")
+        .replaceChildren(...data.recent_clients.map((c) => partyItem("Client", c.name, c.due_amount)));
+    document.getElementById("recent-workers")
+        .replaceChildren(...data.recent_workers.map((w) => partyItem("Worker", w.name, w.due_amount)));
+    document.getElementById("recent-materials")
+        .replaceChildren(...data.recent_materials.map(materialRow));
+};
+
+if (window.EventSource) {
+    const source = new EventSource(liveEventsUrl);
+    let dropped = false;
+
+    source.onmessage = (message) => {
+        const e = JSON.parse(message.data);
+        if (e.type === "ledger") applyLedger(e);
+        else if (e.type === "raw_material") applyRawMaterial(e);
+        else if (e.type === "resync") resync();
+    };
+    // events sent while we were reconnecting are gone, so reload the numbers once
+    source.onerror = () => { dropped = true; };
+    source.onopen = () => {
+        if (dropped) resync();
+        dropped = false;
+    };
+}
@@ -0,0 +1,44 @@
+// Fills the party pickers' datalists from the search endpoint as the user types.
+const partySearchScript = document.currentScript;
+const partySearchUrl = partySearchScript.dataset.url;
+
+// wait this long after the last keystroke before asking the server
+const PARTY_SEARCH_DELAY = 150;
+
+document.querySelectorAll("input.party-search").forEach((input) => {
+    const datalist = document.getElementById(input.getAttribute("list"));
+    let timer = null;
+    let lastTerm = null;
+    let controller = null;
+
+    const refresh = async () => {
+        const term = input.value.trim();
+        if (term === lastTerm) return;
+        lastTerm = term;
+
+        if (controller) controller.abort();
+        controller = new AbortController();
+        const params = new URLSearchParams({ type: input.dataset.type, q: term });
+        try {
+            const response = await fetch(partySearchUrl + "?" + params, {
+                headers: { Accept: "application/json" },
+                signal: controller.signal,
+            });
+            if (!response.ok) return;
+            const data = await response.json();
+            datalist.replaceChildren(...data.results.map((name) => {
+                const option = document.createElement("option");
+                option.value = name;
+                return option;
+            }));
+        } catch (err) {
+            if (err.name !== "AbortError") lastTerm = null;
+        }
+    };
+
+    input.addEventListener("input", () => {
+        clearTimeout(timer);
+        timer = setTimeout(refresh, PARTY_SEARCH_DELAY);
+    });
+    input.addEventListener("focus", refresh);
+});
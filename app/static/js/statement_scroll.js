@@ -0,0 +1,49 @@
+// Loads further statement rows (items / payments) as the user scrolls.
+const statementScript = document.currentScript;
+const statementUrl = statementScript.dataset.url;
+
+const money = (value) =>
+    "₹" + Number(value || 0).toLocaleString("en-US", { minimumFractionDigits: 2, maximumFractionDigits: 2 });
+
+const statementCell = (text) => {
+    const td = document.createElement("td");
+    td.textContent = text;
+    return td;
+};
+
+const statementRow = (section, row) => {
+    const tr = document.createElement("tr");
+    const cells = section === "items"
+        ? [row.item || "-", row.description || "----", row.date, row.quantity ?? 0, money(row.price), money(row.total_amount)]
+        : [row.date, row.mode || "-", row.description || "----", money(row.amount)];
+    cells.forEach((text) => tr.appendChild(statementCell(text)));
+    return tr;
+};
+
+document.querySelectorAll(".scroll-sentinel").forEach((sentinel) => {
+    const section = sentinel.dataset.section;
+    const tbody = document.getElementById(section + "-rows");
+    let loading = false;
+
+    const observer = new IntersectionObserver(async (entries) => {
+        if (!entries[0].isIntersecting || loading || !tbody.dataset.next) return;
+
+        loading = true;
+        try {
+            const url = new URL(statementUrl, window.location.href);
+            url.searchParams.set("section", section);
+            url.searchParams.set("after", tbody.dataset.next);
+            const response = await fetch(url);
+            if (response.ok) {
+                const data = await response.json();
+                data.rows.forEach((row) => tbody.appendChild(statementRow(section, row)));
+                tbody.dataset.next = data.next || "";
+            }
+        } finally {
+            loading = false;
+        }
+        if (!tbody.dataset.next) observer.disconnect();
+    });
+
+    observer.observe(sentinel);
+});
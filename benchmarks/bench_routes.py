@@ -0,0 +1,154 @@
+"""Route latency, query count and memory benchmark.
+
+    python -m benchmarks.bench_routes --size 100k
+    python -m benchmarks.bench_routes --size 1k --database postgresql://localhost/bench
+
+Seeds a fresh database (a temporary SQLite file unless ``--database`` is
+given, which must point at an empty database), then drives the app through
+the Flask test client and reports p50/p95 latency, SQL statements per
+request and peak Python memory per route.
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.seed import SIZES, seed
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def build_routes(app):
+    """Return ``[(label, url, before_each)]`` for the routes we track."""
+    from app import db
+    from app.cache import dashboard_cache
+    from app.models import client_workers, party_balance
+
+    with app.app_context():
+        # the client with the longest history makes the worst-case statement
+        biggest = db.session.execute(
+            db.select(client_workers.client_name)
+            .join(party_balance, party_balance.cw_id == client_workers.cw_id)
+            .where(client_workers.status == "Client")
+            .order_by(party_balance.total_ordered.desc())
+            .limit(1)
+        ).scalar()
+
+    return [
+        ("dashboard (cold)", "/", dashboard_cache.clear),
+        ("dashboard (cached)", "/", None),
+        ("all_clients", "/all_clients", None),
+        ("all_clients search", "/all_clients?search=client 00", None),
+        ("show_client", f"/client/{biggest}", None),
+        ("raw_materials", "/raw_materials", None),
+        ("aging clients", "/reports/aging?type=client", None),
+        ("aging workers", "/reports/aging?type=worker", None),
+    ]
+
+
+def measure(app, routes, iterations):
+    from sqlalchemy import event
+    from app import db
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user"] = "bench"
+
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    listener = lambda *args: statements.append(1)
+    event.listen(engine, "before_cursor_execute", listener)
+
+    results = []
+    try:
+        for label, url, before_each in routes:
+            with app.app_context():
+                if before_each:
+                    before_each()
+            client.get(url)  # warm-up
+
+            latencies, queries = [], []
+            for _ in range(iterations):
+                with app.app_context():
+                    if before_each:
+                        before_each()
+                statements.clear()
+                started = time.perf_counter()
+                response = client.get(url)
+                latencies.append((time.perf_counter() - started) * 1000)
+                queries.append(len(statements))
+                assert response.status_code == 200, (url, response.status_code)
+
+            # separate pass: tracemalloc slows everything down
+            with app.app_context():
+                if before_each:
+                    before_each()
+            tracemalloc.start()
+            client.get(url)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            results.append({
+                "route": label,
+                "p50_ms": round(statistics.median(latencies), 2),
+                "p95_ms": round(_percentile(latencies, 95), 2),
+                "queries": max(queries),
+                "peak_kb": round(peak / 1024, 1),
+            })
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", choices=sorted(SIZES), default="1k")
+    parser.add_argument("--database", help="SQLAlchemy URL of an empty database (default: temp SQLite file)")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    tmp = None
+    if not args.database:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        tmp.close()
+        args.database = f"sqlite:///{tmp.name}"
+    os.environ["DATABASE_URL_EXTERNAL"] = args.database
+
+    from app import create_app, db
+    from app.migrations import upgrade_schema
+
+    app = create_app()
+    try:
+        with app.app_context():
+            upgrade_schema(db.engine)
+            started = time.perf_counter()
+            counts = seed(SIZES[args.size], random_seed=args.seed)
+            seeded_in = time.perf_counter() - started
+
+        results = measure(app, build_routes(app), args.iterations)
+    finally:
+        if tmp:
+            os.unlink(tmp.name)
+
+    if args.json:
+        print(json.dumps({"size": args.size, "rows": counts, "results": results}, indent=2))
+        return
+
+    print(f"size={args.size} seeded in {seeded_in:.1f}s: {counts}")
+    print(f"{'route':<22}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'peak KB':>10}")
+    for r in results:
+        print(f"{r['route']:<22}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['queries']:>9}{r['peak_kb']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Process boot-time benchmark.
+
+    python -m benchmarks.boot_time
+    python -m benchmarks.boot_time --size 100k --runs 10 --database postgresql://localhost/bench
+
+Seeds a fresh database, then starts ``--runs`` fresh interpreters and
+times each start-up phase: importing the app, ``create_app()``, the
+schema check every worker used to run at import (``upgrade_schema`` with
+nothing pending, now skipped unless AUTO_MIGRATE=1) and the cache warm-up
+done once in the gunicorn master.  Reports the median and worst run.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.seed import SIZES, seed
+
+# runs in a fresh interpreter so import costs are not already paid
+CHILD = """
+import json, time
+started = time.perf_counter()
+phases = {}
+
+import app
+phases["import_ms"] = time.perf_counter() - started
+
+mark = time.perf_counter()
+application = app.create_app()
+phases["create_app_ms"] = time.perf_counter() - mark
+
+mark = time.perf_counter()
+from app.migrations import upgrade_schema
+with application.app_context():
+    upgrade_schema(app.db.engine)
+phases["schema_check_ms"] = time.perf_counter() - mark
+
+mark = time.perf_counter()
+from app.boot import warm_caches
+warm_caches(application)
+phases["warm_caches_ms"] = time.perf_counter() - mark
+
+phases = {k: round(v * 1000, 1) for k, v in phases.items()}
+phases["boot_ms"] = round(phases["import_ms"] + phases["create_app_ms"], 1)
+print(json.dumps(phases))
+"""
+
+PHASES = ("import_ms", "create_app_ms", "boot_ms", "schema_check_ms", "warm_caches_ms")
+
+
+def measure(runs, env):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD], env=env, check=True, capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {
+        phase: {
+            "median": round(statistics.median(s[phase] for s in samples), 1),
+            "max": max(s[phase] for s in samples),
+        }
+        for phase in PHASES
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", choices=sorted(SIZES), default="1k")
+    parser.add_argument("--database", help="SQLAlchemy URL of an empty database (default: temp SQLite file)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    tmp = None
+    if not args.database:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        tmp.close()
+        args.database = f"sqlite:///{tmp.name}"
+    os.environ["DATABASE_URL_EXTERNAL"] = args.database
+
+    from app import create_app, db
+    from app.migrations import upgrade_schema
+
+    app = create_app()
+    try:
+        with app.app_context():
+            upgrade_schema(db.engine)
+            seed(SIZES[args.size])
+            db.engine.dispose()
+
+        env = dict(os.environ, AUTO_MIGRATE="0", SCHEDULER_ENABLED="0")
+        started = time.perf_counter()
+        results = measure(args.runs, env)
+        elapsed = time.perf_counter() - started
+    finally:
+        if tmp:
+            os.unlink(tmp.name)
+
+    if args.json:
+        print(json.dumps({"size": args.size, "runs": args.runs, "results": results}, indent=2))
+        return
+
+    print(f"size={args.size} runs={args.runs} ({elapsed:.1f}s)")
+    print(f"{'phase':<18}{'median ms':>11}{'max ms':>10}")
+    for phase in PHASES:
+        print(f"{phase:<18}{results[phase]['median']:>11}{results[phase]['max']:>10}")
+
+
+if __name__ == "__main__":
+    main()
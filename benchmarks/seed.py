@@ -0,0 +1,134 @@
+"""Seeded synthetic data for the benchmarks.
+
+    python -m benchmarks.seed --size 100k --database sqlite:////tmp/bench.db
+
+``size`` is the total number of ledger rows (orders, payments, worker work,
+worker payments and raw materials together).  The same seed always gives
+the same data, so runs are comparable.
+"""
+import argparse
+import os
+import random
+from datetime import date, timedelta
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+INSERT_BATCH = 5_000
+
+ITEMS = ["ring", "chain", "bangle", "pendant", "earring", "anklet", "bracelet", "nosepin"]
+MATERIALS = ["gold", "silver", "copper", "polish", "thread", "box", "stone"]
+MODES = ["Cash", "Online"]
+
+# share of ledger rows per table
+MIX = {
+    "client_orders": 0.40,
+    "client_payments": 0.20,
+    "worker_work": 0.20,
+    "worker_payments": 0.10,
+    "raw_materials": 0.10,
+}
+
+
+def _batches(rows, size=INSERT_BATCH):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed(total_rows, random_seed=42, days=3 * 365):
+    """Fill an empty schema with ``total_rows`` ledger rows. Needs an app context."""
+    from app import db
+    from app.balances import rebuild_balances
+    from app.models import (
+        raw_material,
+        client_payment_details,
+        Client_Order_Details,
+        client_workers,
+        Worker_work_Details,
+        Worker_Payment_Details
+    )
+
+    rng = random.Random(random_seed)
+    start = date.today() - timedelta(days=days)
+    clients = max(20, total_rows // 200)
+    workers = max(5, total_rows // 1000)
+
+    def some_day():
+        return start + timedelta(days=rng.randrange(days))
+
+    parties = [{"client_name": f"Client {i:06d}", "status": "Client"} for i in range(clients)]
+    parties += [{"client_name": f"Worker {i:05d}", "status": "Worker"} for i in range(workers)]
+    db.session.execute(db.insert(client_workers), parties)
+    ids = db.session.execute(db.select(client_workers.cw_id, client_workers.status)).all()
+    client_ids = [cw_id for cw_id, status in ids if status == "Client"]
+    worker_ids = [cw_id for cw_id, status in ids if status == "Worker"]
+
+    # a few big clients (top 2% get 30% of the rows), many small ones
+    big_clients = client_ids[:max(1, len(client_ids) // 50)]
+
+    def some_client():
+        return rng.choice(big_clients) if rng.random() < 0.3 else rng.choice(client_ids)
+
+    counts = {name: int(total_rows * share) for name, share in MIX.items()}
+    generators = {
+        Client_Order_Details: (
+            {"item": rng.choice(ITEMS), "date": some_day(), "description": None,
+             "quantity": rng.randint(1, 20), "price": rng.randint(50, 5000), "cw_id": some_client()}
+            for _ in range(counts["client_orders"])
+        ),
+        client_payment_details: (
+            {"date": some_day(), "mode": rng.choice(MODES), "description": None,
+             "amount": rng.randint(500, 50000), "cw_id": some_client()}
+            for _ in range(counts["client_payments"])
+        ),
+        Worker_work_Details: (
+            {"item": rng.choice(ITEMS), "date": some_day(), "description": None,
+             "quantity": rng.randint(1, 50), "price": rng.randint(5, 200), "cw_id": rng.choice(worker_ids)}
+            for _ in range(counts["worker_work"])
+        ),
+        Worker_Payment_Details: (
+            {"date": some_day(), "mode": rng.choice(MODES), "description": None,
+             "amount": rng.randint(100, 10000), "cw_id": rng.choice(worker_ids)}
+            for _ in range(counts["worker_payments"])
+        ),
+        raw_material: (
+            {"item": rng.choice(MATERIALS), "date": some_day(),
+             "quantity": rng.randint(1, 100), "price": round(rng.uniform(1, 500), 2)}
+            for _ in range(counts["raw_materials"])
+        ),
+    }
+
+    for model, rows in generators.items():
+        for batch in _batches(rows):
+            db.session.execute(db.insert(model), batch)
+        db.session.commit()
+
+    rebuild_balances()
+    db.session.commit()
+    return {"clients": clients, "workers": workers, **counts}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", choices=sorted(SIZES), default="1k")
+    parser.add_argument("--database", required=True, help="SQLAlchemy URL of an empty database")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL_EXTERNAL"] = args.database
+    from app import create_app, db
+    from app.migrations import upgrade_schema
+
+    app = create_app()
+    with app.app_context():
+        upgrade_schema(db.engine)
+        print(seed(SIZES[args.size], random_seed=args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Concurrent write throughput on SQLite.
+
+    python -m benchmarks.sqlite_writes
+    python -m benchmarks.sqlite_writes --processes 8 --entries 500 --untuned
+
+Creates a fresh SQLite file, then starts ``--processes`` interpreters that
+each post ``--entries`` client payments through ``/add_client_payment``
+at the same time, the way gunicorn workers would.  Reports entries per
+second over the whole run and how many posts were lost (the route flashes
+"database is locked" instead of inserting).  ``--untuned`` runs with
+SQLITE_TUNED=0 (driver defaults) for comparison.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# one writer process
+CHILD = """
+import json, sys, time
+from app import create_app
+app = create_app()
+client = app.test_client()
+with client.session_transaction() as session:
+    session["user"] = "bench"
+entries = int(sys.argv[1])
+started = time.perf_counter()
+for n in range(entries):
+    client.post("/add_client_payment", data={
+        "client_name_0": "Bench Client", "date_0": "2024-01-01", "mode_0": "Cash",
+        "description_0": f"entry {n}", "amount_0": "1",
+    })
+    # nobody follows the redirect to read the flash, so do not let them pile up in the cookie
+    with client.session_transaction() as session:
+        session.pop("_flashes", None)
+print(json.dumps({"seconds": time.perf_counter() - started}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--entries", type=int, default=250, help="payments posted per process")
+    parser.add_argument("--untuned", action="store_true", help="run with SQLITE_TUNED=0")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        DATABASE_URL_EXTERNAL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        EVENT_LOG=os.path.join(workdir, "events.jsonl"),
+        SQLITE_TUNED="0" if args.untuned else "1",
+        AUTO_MIGRATE="0",
+        SCHEDULER_ENABLED="0",
+    )
+    os.environ.update(env)
+
+    from sqlalchemy import text
+    from app import create_app, db
+    from app.migrations import upgrade_schema
+    from app.models import client_workers
+
+    app = create_app()
+    with app.app_context():
+        upgrade_schema(db.engine)
+        db.session.add(client_workers(client_name="Bench Client", status="Client"))
+        db.session.commit()
+        db.engine.dispose()
+
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    started = time.perf_counter()
+    children = [
+        subprocess.Popen([sys.executable, "-c", CHILD, str(args.entries)], env=env, cwd=cwd,
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        for _ in range(args.processes)
+    ]
+    outputs = [json.loads(child.communicate()[0].strip().splitlines()[-1]) for child in children]
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        inserted = db.session.execute(text("SELECT COUNT(*) FROM client_payment_details")).scalar()
+        journal = db.session.execute(text("PRAGMA journal_mode")).scalar()
+
+    attempted = args.processes * args.entries
+    results = {
+        "processes": args.processes,
+        "attempted": attempted,
+        "inserted": inserted,
+        "lost": attempted - inserted,
+        "journal_mode": journal,
+        "elapsed_s": round(elapsed, 2),
+        "slowest_process_s": round(max(o["seconds"] for o in outputs), 2),
+        "entries_per_s": round(inserted / elapsed, 1),
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for key, value in results.items():
+        print(f"{key:<20}{value}")
+
+
+if __name__ == "__main__":
+    main()
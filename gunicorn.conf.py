@@ -0,0 +1,33 @@
+# Gunicorn settings; pool sizes in app/engine.py are derived from the same variables.
+import os
+
+# schema changes run in the release phase (see Procfile), not in every worker
+os.environ.setdefault("AUTO_MIGRATE", "0")
+
+from app.engine import server_settings
+
+# every open dashboard holds a gthread thread for its event stream; each worker
+# lets at most EVENT_MAX_STREAMS (default threads // 2) stream at once, so raise
+# GUNICORN_THREADS with the number of dashboards kept open, or use gevent
+worker_class, workers, threads = server_settings()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+# drop connections a worker holds before it is recycled, so restarts do not leak them
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = 100
+accesslog = "-"
+
+# import the app once in the master and fork workers from it (see app/boot.py)
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from app.boot import before_fork
+        before_fork(server.app.wsgi())
+
+
+def post_fork(server, worker):
+    from app.boot import after_fork
+    after_fork(server.app.wsgi())
@@ -1,15 +1,18 @@
 from app import create_app, db
-from app.models import client_workers, Client_Order_Details, client_payment_details, raw_material
 
 
 
 
 app = create_app()
 
-with app.app_context() :
-    db.create_all()
+if app.config["AUTO_MIGRATE"] :
+    from app.migrations import upgrade_schema
+    with app.app_context() :
+        upgrade_schema(db.engine)
 
 
 
 if __name__ == "__main__" :
-    app.run(debug=True)
\ No newline at end of file
+    from app.jobs import init_scheduler
+    init_scheduler(app)
+    app.run(debug=True)
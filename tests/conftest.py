@@ -0,0 +1,62 @@
+"""App fixture: a fresh SQLite file per test, migrated, with a logged-in client."""
+import pytest
+from app import create_app, db
+from app.migrations import upgrade_schema
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL_EXTERNAL", f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv("EVENT_LOG", str(tmp_path / "events.jsonl"))
+    monkeypatch.setenv("ASSET_DIR", str(tmp_path / "assets"))
+    monkeypatch.setenv("REPORT_DIR", str(tmp_path / "reports"))
+    monkeypatch.setenv("SCHEDULER_ENABLED", "0")
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        upgrade_schema(db.engine)
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user"] = "tester"
+    return client
+
+
+@pytest.fixture
+def post(client):
+    """POST a form and expect the redirect every write route answers with."""
+    def post(url, **form):
+        response = client.post(url, data=form)
+        assert response.status_code == 302, (url, response.status_code)
+        return response
+    return post
+
+
+@pytest.fixture
+def add_party(post):
+    def add_party(name, status="Client"):
+        post("/add_client" if status == "Client" else "/add_worker", name=name)
+    return add_party
+
+
+@pytest.fixture
+def add_order(post):
+    def add_order(name, day, quantity, price):
+        post("/add_client_order", client_name=name, item_name="item", description="",
+             date=day, quantity=str(quantity), price=str(price))
+    return add_order
+
+
+@pytest.fixture
+def add_payment(post):
+    def add_payment(name, day, amount):
+        post("/add_client_payment", client_name_0=name, date_0=day, mode_0="Cash",
+             description_0="", amount_0=str(amount))
+    return add_payment
@@ -0,0 +1,73 @@
+from datetime import date
+from app import db
+from app.aging import aging_report
+from app.periods import close_period
+
+
+def buckets(as_of=None, status="Client"):
+    return {
+        row["client_name"]: (row["days_0_30"], row["days_31_60"], row["days_61_90"], row["days_over_90"])
+        for row in aging_report(status, as_of)
+    }
+
+
+def test_payments_cover_oldest_entries_first(add_party, add_order, add_payment):
+    add_party("Acme")
+    add_order("Acme", "2024-01-05", 1, 100)   # 96 days old on 2024-04-10
+    add_order("Acme", "2024-02-20", 1, 100)   # 50 days
+    add_order("Acme", "2024-04-01", 1, 100)   # 9 days
+    add_payment("Acme", "2024-04-05", 150)
+
+    assert buckets(date(2024, 4, 10)) == {"Acme": (100, 50, 0, 0)}
+
+
+def test_fully_paid_party_is_left_out(add_party, add_order, add_payment):
+    add_party("Acme")
+    add_party("Paid Up")
+    add_order("Acme", "2024-01-05", 1, 10)
+    add_order("Paid Up", "2024-01-05", 2, 10)
+    add_payment("Paid Up", "2024-01-06", 20)
+
+    assert buckets(date(2024, 1, 10)) == {"Acme": (10, 0, 0, 0)}
+
+
+def test_past_as_of_ignores_later_entries_and_payments(add_party, add_order, add_payment):
+    add_party("Acme")
+    add_order("Acme", "2024-01-05", 1, 100)
+    add_order("Acme", "2024-03-01", 1, 100)
+    add_payment("Acme", "2024-03-02", 100)
+
+    assert buckets(date(2024, 2, 10)) == {"Acme": (0, 100, 0, 0)}
+    assert buckets(date(2024, 3, 10)) == {"Acme": (100, 0, 0, 0)}
+
+
+def test_closed_period_entries_keep_their_dates(add_party, add_order, add_payment):
+    add_party("Acme")
+    add_order("Acme", "2024-01-05", 1, 100)
+    add_order("Acme", "2024-01-20", 1, 100)
+    add_payment("Acme", "2024-01-25", 50)
+    add_order("Acme", "2024-02-05", 1, 100)
+    before = {day: buckets(day) for day in (date(2024, 1, 22), date(2024, 2, 10), date(2024, 4, 30))}
+    today = buckets()
+
+    close_period(date(2024, 1, 31))
+    db.session.commit()
+
+    # the 2024-01-05 order is 36 days old on 2024-02-10, not 10 days from the period end
+    assert buckets(date(2024, 2, 10)) == {"Acme": (200, 50, 0, 0)}
+    for day, expected in before.items():
+        assert buckets(day) == expected
+    assert buckets() == today
+
+
+def test_settled_carried_balance_counts_as_paid(add_party, add_order, add_payment):
+    add_party("Acme")
+    add_order("Acme", "2024-01-05", 1, 100)
+    add_payment("Acme", "2024-01-25", 150)
+    add_order("Acme", "2024-02-05", 1, 100)
+
+    close_period(date(2024, 1, 31))
+    db.session.commit()
+
+    assert buckets(date(2024, 2, 10)) == {"Acme": (50, 0, 0, 0)}
+    assert sum(buckets()["Acme"]) == 50
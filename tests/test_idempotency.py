@@ -0,0 +1,42 @@
+from app import db
+from app.idempotency import recent_keys
+
+KEY = "fedcba9876543210fedcba9876543210"
+
+
+def order_count():
+    return db.session.execute(db.text("SELECT COUNT(*) FROM client__order__details")).scalar()
+
+
+def order_form(key=KEY):
+    return {"client_name": "Acme", "item_name": "ring", "description": "", "date": "2024-01-05",
+            "quantity": "1", "price": "10", "idempotency_key": key}
+
+
+def test_replayed_post_is_ignored(client, add_party):
+    add_party("Acme")
+
+    first = client.post("/add_client_order", data=order_form())
+    replay = client.post("/add_client_order", data=order_form(), follow_redirects=True)
+
+    assert first.status_code == 302
+    assert "already submitted" in replay.get_data(as_text=True)
+    assert order_count() == 1
+
+
+def test_replay_is_refused_by_the_database_too(client, add_party):
+    add_party("Acme")
+    client.post("/add_client_order", data=order_form())
+    # as if the replay reached another worker
+    recent_keys._keys.clear()
+
+    client.post("/add_client_order", data=order_form())
+
+    assert order_count() == 1
+
+
+def test_each_fresh_form_is_accepted(client, add_party):
+    add_party("Acme")
+    for key in ("1" * 32, "2" * 32):
+        client.post("/add_client_order", data=order_form(key))
+    assert order_count() == 2
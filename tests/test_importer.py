@@ -0,0 +1,82 @@
+import functools
+import io
+from datetime import date
+from app import db
+from app.balances import verify_balances
+from app.idempotency import recent_keys
+from app.importer import import_csv
+from app.models import client_payment_details, idempotency_key
+from app.periods import close_period
+
+KEY = "0123456789abcdef0123456789abcdef"
+
+
+def payments():
+    return db.session.execute(db.select(db.func.count()).select_from(client_payment_details)).scalar()
+
+
+def test_bad_rows_are_reported_and_the_rest_imported(add_party, add_order):
+    add_party("Acme")
+    add_order("Acme", "2024-01-05", 1, 10)
+    close_period(date(2024, 1, 31))
+    db.session.commit()
+    csv = (
+        "Party,Date,Amount,Mode\n"
+        "Acme,2024-02-01,100,Cash\n"
+        "Acme,31/02/2024,100,Cash\n"
+        "Nobody,2024-02-02,100,Cash\n"
+        "Acme,2024-02-03,12.5,Cash\n"
+        "Acme,2024-01-15,100,Cash\n"
+        ",2024-02-04,100,Cash\n"
+        "Acme,05/02/2024,40,Bank\n"
+    )
+
+    report = import_csv("client_payments", io.StringIO(csv))
+
+    assert report.inserted == 2
+    assert [line for line, _ in report.errors] == [3, 4, 5, 6, 7]
+    messages = dict(report.errors)
+    assert "unknown client 'Nobody'" in messages[4]
+    assert "closed period" in messages[6]
+    assert payments() == 2
+    assert verify_balances() == []
+
+
+def test_missing_header_column_rejects_the_file():
+    report = import_csv("client_orders", io.StringIO("party,date,item\nAcme,2024-01-01,x\n"))
+    assert report.inserted == 0
+    assert report.errors == [(1, "header is missing quantity, price")]
+
+
+def upload(client, csv, key=KEY):
+    return client.post("/import", data={
+        "kind": "client_payments", "idempotency_key": key,
+        "file": (io.BytesIO(csv.encode()), "payments.csv"),
+    })
+
+
+def test_form_key_is_committed_before_the_chunks(app, client, add_party, monkeypatch):
+    import app.importer as importer
+
+    add_party("Acme")
+    real_insert, calls = importer._insert_chunk, []
+
+    def first_chunk_fails(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise RuntimeError("disk full")
+        return real_insert(*args)
+
+    monkeypatch.setattr(importer, "_insert_chunk", first_chunk_fails)
+    monkeypatch.setattr("app.routes.imports.import_csv", functools.partial(importer.import_csv, chunk_size=2))
+    csv = "party,date,amount\n" + "".join(f"Acme,2024-02-0{day},10\n" for day in range(1, 6))
+
+    assert upload(client, csv).status_code == 200
+    assert payments() == 3
+    assert db.session.get(idempotency_key, KEY) is not None
+
+    # a retry from another worker (nothing in this process's memory) is still refused
+    recent_keys._keys.clear()
+    response = upload(client, csv)
+    assert response.status_code == 302
+    assert payments() == 3
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app import jobs
+from app.jobs import acquire_lease, release_lease, run_job
+from app.models import job_lock, job_run
+
+pytestmark = pytest.mark.usefixtures("app")
+
+SLOT = datetime(2024, 1, 1, 1, 5)
+
+
+def runs(name="evict_idempotency_keys"):
+    return db.session.execute(db.select(db.func.count()).select_from(job_run).where(job_run.job == name)).scalar()
+
+
+def test_one_holder_at_a_time():
+    assert acquire_lease("nightly_rollups", "host:1")
+    assert not acquire_lease("nightly_rollups", "host:2")
+    # the holder may renew its own lease
+    assert acquire_lease("nightly_rollups", "host:1")
+
+    release_lease("nightly_rollups", "host:1")
+    assert acquire_lease("nightly_rollups", "host:2")
+
+
+def test_expired_lease_can_be_taken_over():
+    assert acquire_lease("nightly_rollups", "host:1")
+    db.session.execute(db.update(job_lock).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.session.commit()
+    assert acquire_lease("nightly_rollups", "host:2")
+
+
+def test_each_slot_runs_once_across_holders(monkeypatch):
+    monkeypatch.setattr(jobs, "holder_id", lambda: "host:1")
+    assert run_job("evict_idempotency_keys", SLOT).status == "success"
+
+    # the second worker's tick for the same slot arrives after the run finished
+    monkeypatch.setattr(jobs, "holder_id", lambda: "host:2")
+    assert run_job("evict_idempotency_keys", SLOT) is None
+    monkeypatch.setattr(jobs, "holder_id", lambda: "host:1")
+    assert run_job("evict_idempotency_keys", SLOT) is None
+
+    assert run_job("evict_idempotency_keys", SLOT + timedelta(hours=1)).status == "success"
+    # manual runs have no slot
+    assert run_job("evict_idempotency_keys").status == "success"
+    assert runs() == 3
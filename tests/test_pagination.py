@@ -0,0 +1,53 @@
+import pytest
+from app.pagination import decode_cursor, encode_cursor
+from app.routes.tasks import party_page
+
+# name -> amount ordered; several parties share a due amount
+DUES = {"Ajay": 50, "Bela": 50, "Chen": 50, "Dara": 20, "Esha": 50, "Farid": 0, "Gita": 20}
+
+
+@pytest.fixture
+def parties(add_party, add_order):
+    for name, due in DUES.items():
+        add_party(name)
+        if due:
+            add_order(name, "2024-01-05", 1, due)
+    return sorted(DUES, key=lambda name: (-DUES[name], name))
+
+
+def names(page):
+    return [item["client_name"] for item in page.items]
+
+
+def test_forward_then_back_visits_every_party_once(parties):
+    pages = [party_page("Client", "", per_page=2)]
+    while pages[-1].next_cursor:
+        pages.append(party_page("Client", "", after=pages[-1].next_cursor, per_page=2))
+
+    assert [name for page in pages for name in names(page)] == parties
+    assert pages[0].prev_cursor is None
+    assert all(page.total == len(parties) for page in pages)
+
+    back = [pages[-1]]
+    while back[-1].prev_cursor:
+        back.append(party_page("Client", "", before=back[-1].prev_cursor, per_page=2))
+    assert [names(page) for page in reversed(back)] == [names(page) for page in pages]
+
+
+def test_search_filters_before_paging(parties):
+    page = party_page("Client", "a", per_page=10)
+    assert names(page) == [name for name in parties if "a" in name.lower()]
+
+
+@pytest.mark.parametrize("values", [[[], [], []], [True, "a", 1], [50, "a"], [50, 1, "a"], {"due": 1}])
+def test_garbled_cursors_fall_back_to_the_first_page(client, parties, values):
+    token = encode_cursor(values) if isinstance(values, list) else "eyJkdWUiOjF9"
+    assert decode_cursor(token, (float, str, int)) is None
+    response = client.get(f"/all_clients?after={token}")
+    assert response.status_code == 200
+    assert parties[0] in response.get_data(as_text=True)
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor((12.5, "Bela", 3)), (float, str, int)) == [12.5, "Bela", 3]
+    assert decode_cursor("not base64!", (float, str, int)) is None
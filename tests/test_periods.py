@@ -0,0 +1,58 @@
+from datetime import date
+import pytest
+from app import db
+from app.balances import verify_balances
+from app.models import party_balance
+from app.periods import carried_forward, close_period
+
+
+def balance(name):
+    return db.session.execute(
+        db.text("SELECT b.* FROM party_balance b JOIN client_workers cw USING (cw_id) WHERE cw.client_name = :n"),
+        {"n": name},
+    ).mappings().one()
+
+
+def test_close_keeps_balances_and_statement_totals(client, add_party, add_order, add_payment):
+    add_party("Acme")
+    add_order("Acme", "2024-01-05", 2, 150)
+    add_payment("Acme", "2024-01-20", 100)
+    add_order("Acme", "2024-02-05", 1, 50)
+    add_payment("Acme", "2024-02-06", 20)
+    before = dict(balance("Acme"))
+    page_before = client.get("/client/Acme").get_data(as_text=True)
+
+    moved = close_period(date(2024, 1, 31))
+    db.session.commit()
+
+    assert sum(moved.values()) == 2
+    assert verify_balances() == []
+    assert dict(balance("Acme")) == before
+    assert tuple(carried_forward(before["cw_id"])) == (300, 100)
+
+    page = client.get("/client/Acme").get_data(as_text=True)
+    for total in ("₹350.00", "₹230.00"):
+        assert total in page_before and total in page
+    assert "₹200.00" in page   # carried forward: 300 ordered - 100 paid
+    archived = client.get("/api/clients/Acme/statement?archived=1").get_json()["rows"]
+    assert [row["date"] for row in archived] == ["05/01/2024"]
+
+
+def test_entries_in_a_closed_period_are_refused(client, add_party, add_order):
+    add_party("Acme")
+    add_order("Acme", "2024-01-05", 1, 10)
+    close_period(date(2024, 1, 31))
+    db.session.commit()
+
+    client.post("/add_client_order", data={"client_name": "Acme", "item_name": "x", "description": "",
+                                           "date": "2024-01-10", "quantity": "1", "price": "5"})
+    assert db.session.get(party_balance, balance("Acme")["cw_id"]).total_ordered == 10
+
+
+def test_periods_close_in_order(add_party, add_order):
+    add_party("Acme")
+    add_order("Acme", "2024-01-05", 1, 10)
+    close_period(date(2024, 2, 29))
+    db.session.commit()
+    with pytest.raises(ValueError):
+        close_period(date(2024, 1, 31))